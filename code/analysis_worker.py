@@ -0,0 +1,183 @@
+"""
+后台情绪分析工作池
+- 爬虫把 (platform, id, content) 放入队列后继续滚动，不等待API返回
+- 队列按批次交给线程池调用 filter_texts，结果回调给sink保存
+- 在途批次数有上限，超出时submit阻塞，起到背压作用
+- 分析失败（远端重试耗尽等）的文本重新排队，超过 requeue_rounds 轮仍失败则保留为"延后"条目，
+  随断点保存，下次 --resume 时重新提交，不会丢失
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import EMOTION_CONFIG
+from emotion_filter import filter_texts, is_analyzable
+
+
+AnalysisItem = namedtuple("AnalysisItem", ["platform", "content_id", "content", "text_data"])
+
+
+class TextAnalysisPool:
+    """
+    文本情绪分析线程池
+    sink(item, should_save, emotion_data) 在工作线程中被调用，只在得到分析结果时调用
+    on_done(item, ok) 在条目有最终结果时调用：ok=True 已分析且sink处理成功（不论是否保存），
+    ok=False 保存失败或已延后到下次运行
+    """
+
+    def __init__(self, sink, batch_size=None, workers=None, max_inflight=None, on_done=None, requeue_rounds=None):
+        self._sink = sink
+        self._on_done_item = on_done
+        self._requeue_rounds = EMOTION_CONFIG["requeue_rounds"] if requeue_rounds is None else requeue_rounds
+        self._batch_size = max(1, batch_size or EMOTION_CONFIG["batch_size"])
+        workers = workers or EMOTION_CONFIG["analysis_workers"]
+        max_inflight = max_inflight or EMOTION_CONFIG["max_inflight_batches"]
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="emotion")
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._futures = set()
+        self._unfinished = {}
+        self._attempts = {}
+        self._pending = 0
+        self.deferred = 0
+        self._closed = False
+        self.processed = 0
+
+    @property
+    def pending(self):
+        """已提交但尚未得到结果的条数（含缓冲区内未发出的）"""
+        with self._lock:
+            return self._pending
+
+    def pending_items(self):
+        """尚未得到结果的条目（按提交顺序，含已延后的），用于写入断点"""
+        with self._lock:
+            return list(self._unfinished.values())
+
+    def submit(self, platform, content_id, content, text_data=None):
+        """提交一条待分析文本；缓冲区满一批时发往线程池"""
+        item = AnalysisItem(platform, content_id, content, text_data or {})
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("分析池已关闭")
+            self._buffer.append(item)
+            self._unfinished[id(item)] = item
+            self._pending += 1
+            if len(self._buffer) < self._batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._dispatch(batch)
+
+    def flush(self):
+        """把缓冲区中不足一批的文本立即发出"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._dispatch(batch)
+
+    def drain(self, timeout=None):
+        """
+        发出剩余文本并等待所有在途批次完成，返回是否全部完成
+        批次失败的文本会被放回缓冲区，因此循环到缓冲区与在途批次同时为空为止
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.flush()
+            with self._lock:
+                futures = list(self._futures)
+                if not futures and not self._buffer:
+                    return True
+            if not futures:
+                continue
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, not_done = wait(futures, timeout=remaining)
+            if not_done:
+                return False
+
+    def shutdown(self, timeout=None):
+        """排空队列后关闭线程池"""
+        with self._lock:
+            self._closed = True
+        drained = self.drain(timeout)
+        if not drained:
+            print(f"⚠️ 分析池关闭时仍有 {self.pending} 条文本未完成")
+        if self.deferred:
+            print(f"⚠️ {self.deferred} 条文本多次分析失败，已保留在断点中，使用 --resume 重试")
+        self._executor.shutdown(wait=drained)
+
+    def _dispatch(self, batch):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._run_batch, batch)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _run_batch(self, batch):
+        try:
+            try:
+                results = filter_texts([item.content for item in batch], self._batch_size)
+            except Exception as e:
+                print(f"批量情绪分析异常: {str(e)[:50]}")
+                results = [(False, None)] * len(batch)
+
+            for item, (should_save, emotion_data) in zip(batch, results):
+                if emotion_data is None and is_analyzable(item.content):
+                    self._retry_or_defer(item)
+                    continue
+                ok = False
+                try:
+                    self._sink(item, should_save, emotion_data)
+                    ok = True
+                except Exception as e:
+                    print(f"  保存分析结果失败: {str(e)[:50]}")
+                finally:
+                    with self._lock:
+                        self._unfinished.pop(id(item), None)
+                        self._attempts.pop(id(item), None)
+                        self._pending -= 1
+                        self.processed += 1
+                    self._notify_done(item, ok)
+        finally:
+            self._slots.release()
+
+    def _retry_or_defer(self, item):
+        """
+        分析失败：放回缓冲区等待下一批（不在工作线程里直接派发，以免占着名额等名额）；
+        超过轮数后保留在 _unfinished 中，只随断点保存
+        """
+        with self._lock:
+            attempts = self._attempts.get(id(item), 0) + 1
+            if attempts <= self._requeue_rounds:
+                self._attempts[id(item)] = attempts
+                self._buffer.append(item)
+                return
+            self._attempts.pop(id(item), None)
+            self._pending -= 1
+            self.deferred += 1
+        self._notify_done(item, False)
+
+    def _notify_done(self, item, ok):
+        if self._on_done_item is None:
+            return
+        try:
+            self._on_done_item(item, ok)
+        except Exception as e:
+            print(f"  分析结果回调失败: {str(e)[:50]}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
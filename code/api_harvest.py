@@ -0,0 +1,336 @@
+"""
+JSON接口采集模式（--mode api）
+浏览器只负责登录，信息流数据直接取自平台的JSON接口，不再渲染和解析DOM：
+- 微博：带浏览器cookies的 requests.Session 直接请求 ajax/feed/hottimeline
+- 小红书：接口请求带签名无法重放，改为滚动页面并从CDP网络事件（performance日志）中取 homefeed 响应
+解析函数是纯函数，输入接口原始JSON、输出与DOM模式相同结构的记录，可直接用录制的JSON验证：
+    python api_harvest.py weibo recorded_hottimeline.json
+    python api_harvest.py xiaohongshu recorded_homefeed.json
+"""
+
+import base64
+import json
+import re
+import time
+from config import WEIBO_CONFIG, XHS_CONFIG, CRAWL_CONFIG, API_CONFIG
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _record(content_id, content, text_data, image_urls):
+    return {"content_id": content_id, "content": content, "text_data": text_data, "image_urls": image_urls}
+
+
+# ---------------- 解析（纯函数） ----------------
+
+def _weibo_image_urls(status):
+    urls = []
+    pic_infos = status.get("pic_infos") or {}
+    for pid in status.get("pic_ids") or []:
+        info = pic_infos.get(pid) or {}
+        url = (info.get("largest") or info.get("large") or info.get("original") or {}).get("url")
+        urls.append(url or f"https://wx1.sinaimg.cn/large/{pid}.jpg")
+    return urls
+
+
+def parse_weibo_status(status, crawl_time=None):
+    """把一条微博status转换为记录；广告或无mid时返回None"""
+    if status.get("promotion") or status.get("mblogtype") == 1:
+        return None
+    mid = str(status.get("mid") or status.get("idstr") or status.get("id") or "")
+    if not mid:
+        return None
+    content = status.get("text_raw")
+    if content is None:
+        content = _TAG_RE.sub("", status.get("text") or "")
+    content = content.strip()
+    nick_name = (status.get("user") or {}).get("screen_name") or "未知"
+    return _record(mid, content, {
+        "platform": "weibo",
+        "mid": mid,
+        "nick_name": nick_name,
+        "content": content,
+        "crawl_time": crawl_time or time.strftime("%Y-%m-%d %H:%M:%S")
+    }, _weibo_image_urls(status))
+
+
+def weibo_statuses(payload):
+    """接口响应中的status列表：顶层 statuses，或包在 data 里（data.statuses）"""
+    return payload.get("statuses") or (payload.get("data") or {}).get("statuses") or []
+
+
+def parse_weibo_timeline(payload, crawl_time=None):
+    """解析 hottimeline / friendstimeline 等接口的响应"""
+    records = (parse_weibo_status(status, crawl_time) for status in weibo_statuses(payload))
+    return [record for record in records if record]
+
+
+def _xhs_image_url(image):
+    url = image.get("url_default") or image.get("urlDefault") or image.get("url")
+    if url:
+        return url
+    for info in image.get("info_list") or image.get("infoList") or []:
+        if info.get("url"):
+            return info["url"]
+    return None
+
+
+def parse_xhs_note(item, crawl_time=None):
+    """解析 homefeed / feed 接口（或页面 __INITIAL_STATE__ 中驼峰命名）的一条笔记；非笔记条目返回None"""
+    note = item.get("note_card") or item.get("noteCard")
+    if not note or (item.get("model_type") or item.get("modelType") or "note") != "note":
+        return None
+    post_id = item.get("id") or note.get("note_id") or note.get("noteId")
+    if not post_id:
+        return None
+    title = (note.get("display_title") or note.get("title") or note.get("displayTitle") or "").strip()
+    desc = (note.get("desc") or "").strip()
+    content = "\n".join(part for part in (title, desc) if part)
+
+    images = note.get("image_list") or note.get("imageList") or []
+    image_urls = [url for url in (_xhs_image_url(image) for image in images) if url]
+    if not image_urls and note.get("cover"):
+        cover = _xhs_image_url(note["cover"])
+        image_urls = [cover] if cover else []
+
+    return _record(post_id, content, {
+        "platform": "xiaohongshu",
+        "post_id": post_id,
+        "content": content,
+        "crawl_time": crawl_time or time.strftime("%Y-%m-%d %H:%M:%S")
+    }, image_urls)
+
+
+def parse_xhs_feed(payload, crawl_time=None):
+    """解析 homefeed / feed 接口的响应"""
+    items = (payload.get("data") or {}).get("items") or payload.get("items") or []
+    records = (parse_xhs_note(item, crawl_time) for item in items)
+    return [record for record in records if record]
+
+
+PARSERS = {
+    "weibo": parse_weibo_timeline,
+    "xiaohongshu": parse_xhs_feed,
+}
+
+
+# ---------------- 采集 ----------------
+
+def build_session(driver, referer):
+    """用浏览器当前的全部cookies构造 requests.Session"""
+    import requests
+    from login_utils import USER_AGENT
+
+    session = requests.Session()
+    cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+    for cookie in cookies:
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Referer": referer,
+        "Accept": "application/json, text/plain, */*",
+        "X-Requested-With": "XMLHttpRequest",
+    })
+    xsrf = next((c["value"] for c in cookies if c["name"] == "XSRF-TOKEN"), None)
+    if xsrf:
+        session.headers["X-XSRF-TOKEN"] = xsrf
+    return session
+
+
+def fetch_weibo_hot_page(session, page):
+    """请求热门信息流的一页（max_id 为页序号）"""
+    response = session.get(API_CONFIG["weibo_hot_url"], params={
+        "since_id": 0,
+        "refresh": 0,
+        "group_id": API_CONFIG["weibo_group_id"],
+        "containerid": API_CONFIG["weibo_group_id"],
+        "extparam": "discover|new_feed",
+        "max_id": page - 1,
+        "count": 10,
+    }, timeout=API_CONFIG["timeout"])
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_weibo_long_text(session, record, status_id):
+    """长微博的 text_raw 会被截断，补取全文"""
+    try:
+        response = session.get(API_CONFIG["weibo_longtext_url"], params={"id": status_id},
+                               timeout=API_CONFIG["timeout"])
+        long_text = (response.json().get("data") or {}).get("longTextContent")
+    except Exception:
+        return
+    if long_text:
+        record["content"] = record["text_data"]["content"] = long_text.strip()
+
+
+class NetworkCapture:
+    """
+    从 performance 日志（CDP网络事件）中取出匹配URL的JSON响应体
+    需要驱动以 capture_network=True 创建；事件经驱动的 NetworkMonitor 读取，与网络空闲等待共用
+    """
+
+    def __init__(self, driver, url_patterns):
+        from page_waits import network_monitor
+        self.driver = driver
+        self.url_patterns = url_patterns
+        self._pending = {}
+        self._events = []
+        self._monitor = network_monitor(driver)
+        if self._monitor is None:
+            raise RuntimeError("接口采集需要以 capture_network=True 创建浏览器")
+        self._monitor.subscribe(self._on_event)
+
+    def _on_event(self, method, params):
+        if method in ("Network.responseReceived", "Network.loadingFinished"):
+            self._events.append((method, params))
+
+    def close(self):
+        self._monitor.unsubscribe(self._on_event)
+
+    def drain(self):
+        """返回自上次调用以来已加载完成的匹配响应（解析后的JSON列表）"""
+        self._monitor.poll()
+        events, self._events = self._events, []
+        payloads = []
+        for method, params in events:
+            if method == "Network.responseReceived":
+                url = params.get("response", {}).get("url", "")
+                if any(pattern in url for pattern in self.url_patterns):
+                    self._pending[params["requestId"]] = url
+            elif method == "Network.loadingFinished" and params.get("requestId") in self._pending:
+                self._pending.pop(params["requestId"])
+                payload = self._response_json(params["requestId"])
+                if payload is not None:
+                    payloads.append(payload)
+        return payloads
+
+    def _response_json(self, request_id):
+        try:
+            body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            text = body.get("body", "")
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text).decode("utf-8")
+            return json.loads(text)
+        except Exception:
+            return None
+
+
+def consume_record(coordinator, record, min_length=0, prepare=None):
+    """
+    把一条记录交给协调器：去重 → 文本与图片提交
+    prepare(record) 在领取成功后、提交前调用，用于补全记录（如长微博全文），已处理过的记录不会触发
+    """
+    if not coordinator.claim(record["content_id"]):
+        return
+    if prepare is not None:
+        prepare(record)
+    coordinator.submit(record["content_id"], record["content"], record["text_data"],
+                       record["image_urls"], min_length)
+    coordinator.save_checkpoint()
+
+
+def harvest_weibo_shard(driver, coordinator, shard=0, shard_count=1):
+    """微博接口采集：第 shard+1 页起，每隔 shard_count 页取一页"""
+    session = build_session(driver, WEIBO_CONFIG["home_url"])
+    page = coordinator.position(shard, shard + 1)
+    label = f"[{shard + 1}/{shard_count}] " if shard_count > 1 else ""
+
+    while coordinator.wants_more(wait_in_flight=True) and page <= CRAWL_CONFIG["max_pages"]:
+        print(f"\n--- {label}接口第 {page} 页 | {coordinator.progress()} ---")
+        try:
+            payload = fetch_weibo_hot_page(session, page)
+        except Exception as e:
+            print(f"第 {page} 页接口请求失败：{str(e)[:50]}")
+            break
+
+        statuses = {str(s.get("mid") or s.get("idstr") or ""): s for s in weibo_statuses(payload)}
+        records = parse_weibo_timeline(payload)
+        if not records:
+            print(f"第 {page} 页没有数据")
+            break
+
+        def fetch_long_text(record):
+            status = statuses.get(record["content_id"], {})
+            if status.get("isLongText") and coordinator.wants_text():
+                fetch_weibo_long_text(session, record, status.get("mblogid") or record["content_id"])
+
+        for record in records:
+            if not coordinator.wants_more():
+                break
+            consume_record(coordinator, record, min_length=10, prepare=fetch_long_text)
+
+        page += shard_count
+        coordinator.set_position(shard, page)
+        coordinator.save_checkpoint(force=True)
+        time.sleep(API_CONFIG["request_interval"])
+
+
+def harvest_xiaohongshu_shard(driver, coordinator, shard=0, shard_count=1):
+    """小红书接口采集：滚动触发信息流请求，网络空闲后从网络事件中解析笔记"""
+    from page_waits import wait_for_document_ready, wait_for_network_idle
+    channels = XHS_CONFIG["channels"]
+    explore_url = XHS_CONFIG["explore_url"]
+    if shard_count > 1:
+        explore_url = f"{explore_url}?channel_id={channels[shard % len(channels)]}"
+    label = f"[{shard + 1}/{shard_count}] " if shard_count > 1 else ""
+
+    capture = NetworkCapture(driver, API_CONFIG["xhs_feed_patterns"])
+    try:
+        capture.drain()
+        driver.get(explore_url)
+        wait_for_document_ready(driver)
+        wait_for_network_idle(driver)
+
+        scroll_count = coordinator.position(shard, 0)
+        max_scrolls = CRAWL_CONFIG["max_pages"] * 5
+        idle_scrolls = 0
+
+        while coordinator.wants_more(wait_in_flight=True) and scroll_count < max_scrolls:
+            scroll_count += 1
+            records = [record for payload in capture.drain() for record in parse_xhs_feed(payload)]
+            print(f"\n--- {label}滚动 {scroll_count} | 新笔记 {len(records)} | {coordinator.progress()} ---")
+
+            for record in records:
+                if not coordinator.wants_more():
+                    break
+                consume_record(coordinator, record)
+
+            idle_scrolls = 0 if records else idle_scrolls + 1
+            if idle_scrolls >= API_CONFIG["max_idle_scrolls"]:
+                print("⚠️ 连续多次滚动未捕获到信息流数据，结束")
+                break
+
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            wait_for_network_idle(driver)
+            coordinator.set_position(shard, scroll_count)
+            coordinator.save_checkpoint(force=True)
+    finally:
+        capture.close()
+
+
+HARVESTERS = {
+    "weibo": harvest_weibo_shard,
+    "xiaohongshu": harvest_xiaohongshu_shard,
+}
+
+
+def main(argv=None):
+    """用录制的接口JSON检查解析结果"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="解析录制的接口JSON")
+    parser.add_argument("platform", choices=sorted(PARSERS))
+    parser.add_argument("files", nargs="+", help="接口响应JSON文件")
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        with open(path, "r", encoding="utf-8") as f:
+            records = PARSERS[args.platform](json.load(f))
+        print(f"{path}：{len(records)} 条")
+        for record in records:
+            print(f"  {record['content_id']} | 图片 {len(record['image_urls'])} | {record['content'][:40]}")
+
+
+if __name__ == "__main__":
+    main()
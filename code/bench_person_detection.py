@@ -0,0 +1,120 @@
+"""
+人体检测 精度/速度 对比脚本
+样本目录结构（图片放入对应子目录即为标注）：
+    samples/
+    ├── person/       # 有人脸或人体
+    └── no_person/    # 无人
+
+运行方式：
+    python bench_person_detection.py samples/
+    python bench_person_detection.py samples/ --max-sides 320,480,640 --min-neighbors 3,4,5
+
+以完整分辨率检测为基准，列出各组快速模式参数的召回率、精确率与单张耗时，
+选择召回率不低于基准、耗时最低的一组写入 PERSON_DETECT_* 环境变量即可。
+"""
+
+import argparse
+import itertools
+import os
+import time
+
+try:
+    import cv2
+except ImportError:
+    print("❌ 请先安装依赖：pip install opencv-python")
+    exit(1)
+
+import model_registry
+from person_detection import detect_person
+
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+
+def load_samples(sample_dir):
+    """读取标注样本，返回 [(文件名, 图像, 是否有人), ...]"""
+    samples = []
+    for label_dir, label in (("person", True), ("no_person", False)):
+        folder = os.path.join(sample_dir, label_dir)
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if not filename.lower().endswith(IMAGE_EXTS):
+                continue
+            img = cv2.imread(os.path.join(folder, filename))
+            if img is not None:
+                samples.append((filename, img, label))
+    return samples
+
+
+def evaluate(samples, **params):
+    """运行一组参数，返回指标字典"""
+    tp = fp = fn = tn = 0
+    start = time.perf_counter()
+    for _, img, label in samples:
+        person_type, _ = detect_person(img, **params)
+        predicted = person_type is not None
+        if predicted and label:
+            tp += 1
+        elif predicted:
+            fp += 1
+        elif label:
+            fn += 1
+        else:
+            tn += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "accuracy": (tp + tn) / len(samples),
+        "ms_per_image": elapsed * 1000 / len(samples),
+    }
+
+
+def _parse_list(value, cast):
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="人体检测精度/速度对比")
+    parser.add_argument("sample_dir", help="含 person/ 与 no_person/ 子目录的样本目录")
+    parser.add_argument("--max-sides", default="320,480,640,800")
+    parser.add_argument("--scale-factors", default="1.1,1.2")
+    parser.add_argument("--min-neighbors", default="3,4")
+    args = parser.parse_args()
+
+    samples = load_samples(args.sample_dir)
+    if not samples:
+        print(f"⚠️ 未找到样本: {args.sample_dir}/person 或 no_person")
+        return
+
+    positives = sum(1 for _, _, label in samples if label)
+    print(f"样本：{len(samples)} 张（有人 {positives} / 无人 {len(samples) - positives}）")
+    model_registry.get_cascades()
+
+    rows = [("完整分辨率 1.1/4", evaluate(samples, fast=False, scale_factor=1.1, min_neighbors=4))]
+    grid = itertools.product(
+        _parse_list(args.max_sides, int),
+        _parse_list(args.scale_factors, float),
+        _parse_list(args.min_neighbors, int),
+    )
+    for max_side, scale_factor, min_neighbors in grid:
+        metrics = evaluate(samples, fast=True, max_side=max_side,
+                           scale_factor=scale_factor, min_neighbors=min_neighbors)
+        rows.append((f"快速 {max_side}px {scale_factor}/{min_neighbors}", metrics))
+
+    baseline = rows[0][1]
+    print("-" * 72)
+    print(f"{'参数':<24}{'召回率':>8}{'精确率':>8}{'准确率':>8}{'毫秒/张':>10}{'加速':>8}")
+    print("-" * 72)
+    for name, m in rows:
+        speedup = baseline["ms_per_image"] / m["ms_per_image"] if m["ms_per_image"] else 0.0
+        mark = " ✓" if m["recall"] >= baseline["recall"] else ""
+        print(f"{name:<24}{m['recall']:>8.2%}{m['precision']:>8.2%}{m['accuracy']:>8.2%}"
+              f"{m['ms_per_image']:>10.1f}{speedup:>7.1f}x{mark}")
+    print("-" * 72)
+    print("✓ 表示召回率不低于完整分辨率基准")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+爬取断点
+- 每个平台一个JSON文件：./data/checkpoints/<平台>.json
+- 写入先落到临时文件再 os.replace，崩溃时不会留下半个文件
+- 内容：各分片的页码/滚动次数、统计计数、本次已处理ID、尚未完成情绪分析的文本
+恢复语义为"至少一次"：断点之后已保存的少量文本在恢复时可能再分析一次
+"""
+
+import json
+import os
+import time
+from config import CHECKPOINT_CONFIG
+
+CHECKPOINT_VERSION = 2
+
+
+class CrawlCheckpoint:
+    """单个平台的断点文件"""
+
+    def __init__(self, platform, directory=None, interval=None):
+        self.platform = platform
+        directory = directory or CHECKPOINT_CONFIG["path"]
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{platform}.json")
+        self.interval = CHECKPOINT_CONFIG["interval"] if interval is None else interval
+        self._last_saved = 0.0
+
+    def load(self):
+        """读取断点；不存在或损坏时返回None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 断点文件无法读取，将重新开始: {str(e)[:50]}")
+            return None
+        if state.get("version") != CHECKPOINT_VERSION or state.get("platform") != self.platform:
+            return None
+        return state
+
+    def save(self, state):
+        """原子写入断点"""
+        state = {**state, "version": CHECKPOINT_VERSION, "platform": self.platform,
+                 "updated_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._last_saved = time.monotonic()
+
+    def maybe_save(self, build_state):
+        """距上次写入超过 interval 秒时才调用 build_state() 并写入"""
+        if time.monotonic() - self._last_saved < self.interval:
+            return False
+        self.save(build_state())
+        return True
+
+    def clear(self):
+        """爬取正常结束后删除断点"""
+        for path in (self.path, f"{self.path}.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
@@ -11,6 +11,12 @@ WEIBO_CONFIG = {
 XHS_CONFIG = {
     "explore_url": "https://www.xiaohongshu.com/explore",
     "home_url": "https://www.xiaohongshu.com",
+    # 多浏览器并行时每个浏览器分到一个频道
+    "channels": [
+        "homefeed_recommend", "homefeed.fashion_v3", "homefeed.food_v3", "homefeed.cosmetics_v3",
+        "homefeed.movie_and_tv_v3", "homefeed.career_v3", "homefeed.love_v3",
+        "homefeed.household_product_v3", "homefeed.gaming_v3", "homefeed.travel_v3", "homefeed.fitness_v3",
+    ],
 }
 
 SAVE_CONFIG = {
@@ -18,12 +24,94 @@ SAVE_CONFIG = {
     "image_path": os.getenv("SAVE_IMAGE_PATH", "./data/images"),
 }
 
+STORAGE_CONFIG = {
+    "text_format": os.getenv("TEXT_STORAGE_FORMAT", "jsonl"),  # jsonl 或 json（旧格式）
+    "fsync_interval": float(os.getenv("STORAGE_FSYNC_INTERVAL", "5")),
+    "max_file_mb": int(os.getenv("STORAGE_MAX_FILE_MB", "64")),
+}
+
+IMAGE_DOWNLOAD_CONFIG = {
+    "workers": int(os.getenv("IMAGE_DOWNLOAD_WORKERS", "8")),
+    "per_host": int(os.getenv("IMAGE_DOWNLOAD_PER_HOST", "4")),
+    "max_queued": int(os.getenv("IMAGE_DOWNLOAD_MAX_QUEUED", "64")),
+    "retries": int(os.getenv("IMAGE_DOWNLOAD_RETRIES", "3")),
+    "backoff": 1.0,
+    "timeout": 15,
+}
+
+# 本地图片筛选（filter_images_local.py）
+# 缩图快速检测默认关闭：先用 bench_person_detection.py 在标注样本上确认召回率不低于原图检测，再设 PERSON_DETECT_FAST=1
+IMAGE_FILTER_CONFIG = {
+    "fast_detect": os.getenv("PERSON_DETECT_FAST", "0") == "1",
+    "detect_max_side": int(os.getenv("PERSON_DETECT_MAX_SIDE", "640")),
+    "detect_scale_factor": float(os.getenv("PERSON_DETECT_SCALE_FACTOR", "1.1")),
+    "detect_min_neighbors": int(os.getenv("PERSON_DETECT_MIN_NEIGHBORS", "4")),
+    # 情绪分类的批大小：越大吞吐越高，单张延迟也越高（纯CPU机器可调小）
+    "fer_batch_size": int(os.getenv("FER_BATCH_SIZE", "8")),
+}
+
+# 浏览器配置
+# interactive：有界面、加载图片，适合首次扫码登录
+# crawl：无头、网络层拦截图片/字体/媒体、持久化用户目录，适合无人值守运行
+BROWSER_CONFIG = {
+    "profile": os.getenv("BROWSER_PROFILE", "interactive"),
+    "pool_size": int(os.getenv("BROWSER_POOL_SIZE", "1")),  # 并行浏览器数量
+    "user_data_dir": os.getenv("BROWSER_USER_DATA_DIR", "./data/browser_profile"),
+    "crawl_window_size": os.getenv("BROWSER_CRAWL_WINDOW_SIZE", "1280,800"),
+    # 图片另由 Chrome 内容设置整体禁止（不依赖URL后缀），这里补充字体与音视频
+    "blocked_url_patterns": [
+        "*.jpg?*", "*.jpeg?*", "*.png?*", "*.gif?*", "*.webp?*",
+        "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.ico",
+        "*.woff*", "*.ttf*", "*.otf*",
+        "*.mp4*", "*.m3u8*", "*.flv*", "*.webm*", "*.mp3*",
+    ],
+}
+
+# 登录会话持久化（需要 pip install cryptography）
+SESSION_CONFIG = {
+    "enabled": os.getenv("SESSION_PERSIST", "1") != "0",
+    "path": os.getenv("SESSION_PATH", "./data/sessions"),
+    # 密钥文件默认放在用户配置目录，不与加密后的会话文件放在一起
+    "key_path": os.path.expanduser(os.getenv("SESSION_KEY_PATH", "~/.config/xhs-weibo-crawler/session.key")),
+    "secret": os.getenv("SESSION_SECRET", ""),  # Fernet密钥，设置后优先于密钥文件
+    "max_age_days": float(os.getenv("SESSION_MAX_AGE_DAYS", "30")),  # 0 表示不限
+}
+
 CRAWL_CONFIG = {
     "target_texts": int(os.getenv("TARGET_TEXTS", "100")),
     "target_images": int(os.getenv("TARGET_IMAGES", "100")),
     "max_pages": int(os.getenv("MAX_PAGES", "100")),
     "scroll_pause": 2,
     "page_load_wait": 5,
+    "mode": os.getenv("CRAWL_MODE", "dom"),  # dom：解析页面 / api：直接取JSON接口
+    # 小红书笔记提取：click＝逐条点开笔记 / fast＝带正文的笔记直接读页面内嵌的信息流数据，其余仍点开
+    "xhs_extract": os.getenv("XHS_EXTRACT", "click"),
+    # 无限滚动：连续多少次滚动没有新卡片视为到底；已处理卡片离开视口多少屏后移除其图片/视频（0＝不移除）；
+    # 页面内最多记住多少条已返回的链接（超出时淘汰最早的）
+    "feed_idle_scrolls": int(os.getenv("FEED_IDLE_SCROLLS", "3")),
+    "feed_prune_screens": int(os.getenv("FEED_PRUNE_SCREENS", "5")),
+    "feed_seen_cap": int(os.getenv("FEED_SEEN_CAP", "5000")),
+}
+
+# 页面等待上限（秒），实际在条件满足时立即返回
+WAIT_CONFIG = {
+    "page_load_timeout": float(os.getenv("WAIT_PAGE_LOAD_TIMEOUT", "15")),
+    "new_cards_timeout": float(os.getenv("WAIT_NEW_CARDS_TIMEOUT", "5")),
+    "modal_timeout": float(os.getenv("WAIT_MODAL_TIMEOUT", "5")),
+    "network_idle_ms": int(os.getenv("WAIT_NETWORK_IDLE_MS", "500")),
+    "network_idle_timeout": float(os.getenv("WAIT_NETWORK_IDLE_TIMEOUT", "10")),
+    "login_poll": 0.5,
+}
+
+# JSON接口采集模式
+API_CONFIG = {
+    "weibo_hot_url": "https://weibo.com/ajax/feed/hottimeline",
+    "weibo_group_id": os.getenv("WEIBO_HOT_GROUP_ID", "102803"),
+    "weibo_longtext_url": "https://weibo.com/ajax/statuses/longtext",
+    "xhs_feed_patterns": ["/api/sns/web/v1/homefeed", "/api/sns/web/v1/feed"],
+    "request_interval": float(os.getenv("API_REQUEST_INTERVAL", "1.0")),  # 秒，微博接口两页之间的间隔
+    "max_idle_scrolls": 3,
+    "timeout": 15,
 }
 
 _deepseek_key = os.getenv("DEEPSEEK_API_KEY", "")
@@ -37,6 +125,79 @@ EMOTION_CONFIG = {
     "min_score": 0.3,
     "deepseek_api_key": _deepseek_key,
     "deepseek_api_url": "https://api.deepseek.com/v1/chat/completions",
+    "deepseek_model": os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
+    "batch_size": int(os.getenv("TEXT_BATCH_SIZE", "10")),
+    "batch_retries": int(os.getenv("TEXT_BATCH_RETRIES", "2")),
+    "analysis_workers": int(os.getenv("ANALYSIS_WORKERS", "4")),
+    "max_inflight_batches": int(os.getenv("MAX_INFLIGHT_BATCHES", "8")),
+    # 分析失败（DeepSeek重试耗尽、未配置API等）的文本重新排队的轮数，仍失败则留到断点中下次续跑
+    "requeue_rounds": int(os.getenv("TEXT_REQUEUE_ROUNDS", "2")),
+}
+
+# DeepSeek 共享客户端：令牌桶限流 + AIMD自适应并发
+# 实际并发还受 ANALYSIS_WORKERS 限制，两者取较小值
+DEEPSEEK_CLIENT_CONFIG = {
+    "requests_per_minute": float(os.getenv("DEEPSEEK_RPM", "60")),
+    "tokens_per_minute": float(os.getenv("DEEPSEEK_TPM", "120000")),
+    "initial_concurrency": int(os.getenv("DEEPSEEK_INITIAL_CONCURRENCY", "2")),
+    "max_concurrency": int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "8")),
+    "latency_target": float(os.getenv("DEEPSEEK_LATENCY_TARGET", "20")),  # 秒，超过即视为过载
+    "max_retries": int(os.getenv("DEEPSEEK_MAX_RETRIES", "6")),
+    "backoff": float(os.getenv("DEEPSEEK_BACKOFF", "1.0")),
+    "max_backoff": float(os.getenv("DEEPSEEK_MAX_BACKOFF", "60")),
+    "timeout": float(os.getenv("DEEPSEEK_TIMEOUT", "60")),
+}
+
+TEXT_ENGINE_CONFIG = {
+    "engine": os.getenv("TEXT_ENGINE", "deepseek"),  # deepseek / lexicon / onnx
+    "onnx_model_path": os.getenv("TEXT_ONNX_MODEL", "./models/text_emotion.onnx"),
+    "onnx_tokenizer_path": os.getenv("TEXT_ONNX_TOKENIZER", "./models/tokenizer.json"),
+    "onnx_labels": os.getenv("TEXT_ONNX_LABELS", "喜,怒,哀,惧,惊,厌,中性").split(","),
+    "onnx_max_length": int(os.getenv("TEXT_ONNX_MAX_LENGTH", "128")),
+    "onnx_batch_size": int(os.getenv("TEXT_ONNX_BATCH_SIZE", "64")),
+}
+
+CACHE_CONFIG = {
+    "text_cache_enabled": os.getenv("TEXT_CACHE_ENABLED", "1") != "0",
+    "text_cache_path": os.getenv("TEXT_CACHE_PATH", "./data/cache/text_emotion.sqlite3"),
+    "text_cache_ttl_days": float(os.getenv("TEXT_CACHE_TTL_DAYS", "30")),
+    "text_cache_max_entries": int(os.getenv("TEXT_CACHE_MAX_ENTRIES", "200000")),
+}
+
+PREFILTER_CONFIG = {
+    "enabled": os.getenv("TEXT_PREFILTER_ENABLED", "1") != "0",
+    "model_path": os.getenv("TEXT_PREFILTER_MODEL", "./data/cache/prefilter_model.json"),
+    "threshold": float(os.getenv("TEXT_PREFILTER_THRESHOLD", "0.95")),  # 中性置信度达到该值才跳过远端
+    # 无训练模型时，没有任何情绪词与感叹语气的文本的中性置信度；不低于 threshold 时这类文本直接判为中性
+    "lexicon_confidence": float(os.getenv("TEXT_PREFILTER_LEXICON_CONFIDENCE", "0.95")),
+    "audit_rate": float(os.getenv("TEXT_PREFILTER_AUDIT_RATE", "0.05")),  # 被跳过文本中仍送远端核对的比例
+}
+
+NEAR_DUP_CONFIG = {
+    "enabled": os.getenv("NEAR_DUP_ENABLED", "1") != "0",
+    "path": os.getenv("NEAR_DUP_PATH", "./data/cache/near_dup.sqlite3"),
+    "max_distance": int(os.getenv("NEAR_DUP_MAX_DISTANCE", "3")),  # SimHash汉明距离不超过该值视为近重复
+    "shingle_size": int(os.getenv("NEAR_DUP_SHINGLE", "3")),
+}
+
+SEEN_INDEX_CONFIG = {
+    "enabled": os.getenv("SEEN_INDEX_ENABLED", "1") != "0",
+    "path": os.getenv("SEEN_INDEX_PATH", "./data/cache/seen_ids.sqlite3"),
+    "ttl_days": float(os.getenv("SEEN_INDEX_TTL_DAYS", "0")),  # 0 表示永不过期
+}
+
+CHECKPOINT_CONFIG = {
+    "path": os.getenv("CHECKPOINT_PATH", "./data/checkpoints"),
+    "interval": float(os.getenv("CHECKPOINT_INTERVAL", "30")),  # 秒，两次断点写入的最短间隔
+}
+
+# Parquet 导出（parquet_export.py）
+PARQUET_CONFIG = {
+    "path": os.getenv("PARQUET_PATH", "./data/parquet"),
+    "compression": os.getenv("PARQUET_COMPRESSION", "zstd"),
+    "compression_level": int(os.getenv("PARQUET_COMPRESSION_LEVEL", "3")),
+    # 使用字典编码的文本列（低基数列收益最大，正文等高基数列不建议加入）
+    "dictionary_columns": [c for c in os.getenv("PARQUET_DICTIONARY_COLUMNS", "nick_name,dominant,report").split(",") if c],
 }
 
 for path in [SAVE_CONFIG["text_path"], SAVE_CONFIG["image_path"]]:
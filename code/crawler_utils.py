@@ -5,22 +5,58 @@
 """
 
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import StaleElementReferenceException
 import time
-import re
 import os
-import requests
-from config import XHS_CONFIG, WEIBO_CONFIG, SAVE_CONFIG, CRAWL_CONFIG
-from emotion_filter import filter_text
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import XHS_CONFIG, WEIBO_CONFIG, SAVE_CONFIG, CRAWL_CONFIG, STORAGE_CONFIG
+from analysis_worker import TextAnalysisPool
+from storage import get_writer
+from image_downloader import ImageDownloadManager, download_image, IMAGE_REFERERS
+from near_dup import is_near_duplicate, remember_text
+from seen_index import has_seen, mark_seen, image_namespace
+from checkpoint import CrawlCheckpoint
+from api_harvest import HARVESTERS, consume_record
+from dom_extract import extract_weibo_cards, extract_xhs_feed_notes, xhs_post_id
+from feed_iterator import iter_feed_cards
+from page_waits import (
+    wait_for_document_ready, wait_for_new_elements,
+    wait_for_modal_open, wait_for_modal_close, no_implicit_wait
+)
+
+# 与下方 XPath 对应的 CSS 选择器，供 MutationObserver 统计卡片数量
+XHS_CARD_CSS = "section[class*='note-item'], div[class*='note-item']"
+XHS_FEED_CSS = f"{XHS_CARD_CSS}, a[href*='/explore/']"
+WEIBO_CARD_CSS = "div[class*='card-wrap']:not([class*='ad']), article[class*='Feed']"
+XHS_NOTE_TEXT = (By.XPATH, "//div[contains(@class, 'note-text')]")
 
 
 def save_filtered_text(platform, text_data, emotion_data):
     """保存通过筛选的文本"""
+    save_dir = os.path.join(SAVE_CONFIG["text_path"], platform)
+    save_item = {
+        **text_data,
+        "emotion_analysis": emotion_data
+    }
+    
+    if STORAGE_CONFIG["text_format"] == "jsonl":
+        writer = get_writer(
+            save_dir,
+            fsync_interval=STORAGE_CONFIG["fsync_interval"],
+            max_bytes=STORAGE_CONFIG["max_file_mb"] * 1024 * 1024
+        )
+        writer.write(save_item)
+        return True
+    
+    return _save_filtered_text_json(save_dir, save_item)
+
+
+def _save_filtered_text_json(save_dir, save_item):
+    """旧格式：整文件读-改-写的JSON数组（仅为兼容保留）"""
     import json
     from datetime import datetime
     
-    save_dir = os.path.join(SAVE_CONFIG["text_path"], platform)
     os.makedirs(save_dir, exist_ok=True)
     
     filename = f"filtered_{datetime.now().strftime('%Y%m%d')}.json"
@@ -31,10 +67,6 @@ def save_filtered_text(platform, text_data, emotion_data):
         with open(filepath, "r", encoding="utf-8") as f:
             existing_data = json.load(f)
     
-    save_item = {
-        **text_data,
-        "emotion_analysis": emotion_data
-    }
     existing_data.append(save_item)
     
     with open(filepath, "w", encoding="utf-8") as f:
@@ -43,313 +75,483 @@ def save_filtered_text(platform, text_data, emotion_data):
     return True
 
 
+class TextSaveSink:
+    """
+    分析结果回调：符合情绪条件且未达目标数时保存文本
+    由分析线程调用，内部加锁保证计数准确
+    """
+    
+    def __init__(self, platform, target_texts, stats, saved=0):
+        self.platform = platform
+        self.target_texts = target_texts
+        self.stats = stats
+        self.saved = saved
+        self._lock = threading.Lock()
+    
+    def __call__(self, item, should_save, emotion_data):
+        if not should_save:
+            return
+        
+        with self._lock:
+            if self.saved >= self.target_texts:
+                return
+            save_filtered_text(self.platform, item.text_data, emotion_data)
+            self.saved += 1
+            self.stats["texts_saved"] += 1
+            dominant = emotion_data.get("dominant", "?")
+            author = f" | {item.text_data['nick_name']}" if item.text_data.get("nick_name") else ""
+            print(f"  ✓ 文本已保存 [{self.saved}/{self.target_texts}] 主情绪: {dominant}{author}")
+
+
 def save_image_for_local_analysis(platform, image_url, post_id, index):
     """
-    下载图片用于本地分析
+    同步下载单张图片用于本地分析（爬取循环中请使用 ImageDownloadManager）
     图片情绪筛选需要在本地运行
     """
     save_dir = os.path.join(SAVE_CONFIG["image_path"], platform, "pending")
     os.makedirs(save_dir, exist_ok=True)
     
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Referer": "https://weibo.com/" if platform == "weibo" else "https://www.xiaohongshu.com/"
-        }
-        resp = requests.get(image_url, headers=headers, timeout=15)
-        
-        if resp.status_code == 200:
-            filename = f"{post_id}_{index}.jpg"
-            filepath = os.path.join(save_dir, filename)
-            
-            with open(filepath, "wb") as f:
-                f.write(resp.content)
-            
-            return filepath
-    except Exception as e:
-        print(f"  图片下载失败: {str(e)[:30]}")
-    
-    return None
+    filepath = os.path.join(save_dir, f"{post_id}_{index}.jpg")
+    return download_image(image_url, filepath, IMAGE_REFERERS.get(platform))
 
 
-def crawl_xiaohongshu(driver, target_texts=None, target_images=None):
+class CrawlCoordinator:
     """
-    爬取小红书
-    逻辑：爬取 → 情绪筛选 → 符合条件才存储
+    单个平台的爬取协调器，所有分片（浏览器）共享一个实例
+    - 全局配额：共用 TextSaveSink / TextAnalysisPool / ImageDownloadManager
+    - 跨分片去重：claim() 保证同一ID只被一个分片处理
+    - 跨运行去重：文本分析与图片下载都成功后才写入已处理索引，
+      因目标已满被跳过或处理失败的内容不写入，下次运行仍会重新处理
+    - 统计计数与断点（各分片的页码/滚动次数分别记录）
     """
-    print("=" * 60)
-    print("开始爬取小红书数据...")
-    print("=" * 60)
     
-    saved_texts = 0
-    saved_images = 0
-    target_texts = target_texts or CRAWL_CONFIG["target_texts"]
-    target_images = target_images or CRAWL_CONFIG["target_images"]
-    processed_ids = set()
+    def __init__(self, platform, target_texts, target_images, shard_count=1, resume=False):
+        self.platform = platform
+        self.target_texts = target_texts
+        self.target_images = target_images
+        self.shard_count = shard_count
+        self.checkpoint = CrawlCheckpoint(platform)
+        self.state = self.checkpoint.load() if resume else None
+        state = self.state or {}
+        
+        self.processed_ids = set(state.get("processed_ids", []))
+        # 分片数变化时旧的位置无法对应，只保留去重集合与计数
+        same_layout = state.get("shard_count", 1) == shard_count
+        self.positions = {int(k): v for k, v in state.get("positions", {}).items()} if same_layout else {}
+        self.stats = {"total_checked": 0, "texts_saved": 0, "images_downloaded": 0,
+                      "near_duplicates": 0, "already_seen": 0}
+        self.stats.update(state.get("stats", {}))
+        
+        self.text_sink = TextSaveSink(platform, target_texts, self.stats, saved=self.stats["texts_saved"])
+        self.analysis_pool = TextAnalysisPool(self.text_sink, on_done=self._on_text_done)
+        self.image_manager = ImageDownloadManager(target_images, completed=self.stats["images_downloaded"],
+                                                  on_done=self._on_image_done)
+        self.finished = False
+        self._lock = threading.Lock()
+        # content_id → {"remaining": 未结束的任务数, "ok": 是否全部成功, "persistent": 是否写入已处理索引}
+        self._open = {}
+        # 本次运行中未处理完整的ID，不写入断点的去重集合
+        self._incomplete = set()
+        self._checkpoint_lock = threading.Lock()
     
-    stats = {"total_checked": 0, "texts_saved": 0, "images_downloaded": 0}
+    def resume_pending(self):
+        """把断点中尚未完成情绪分析的文本重新提交"""
+        if not self.state:
+            return
+        pending = self.state.get("pending", [])
+        for item in pending:
+            with self._lock:
+                self.processed_ids.add(item["content_id"])
+            self._track(item["content_id"], item.get("persistent", True))
+            self._add_task(item["content_id"])
+            self.analysis_pool.submit(item["platform"], item["content_id"], item["content"], item["text_data"])
+            self._task_done(item["content_id"], True)
+        print(f"→ 从断点恢复（{self.state.get('updated_at', '?')}）：已保存文本 {self.stats['texts_saved']} 条，"
+              f"图片 {self.stats['images_downloaded']} 张，重新提交待分析 {len(pending)} 条")
     
-    try:
-        print(f"→ 访问探索页面：{XHS_CONFIG['explore_url']}")
-        driver.get(XHS_CONFIG["explore_url"])
-        time.sleep(CRAWL_CONFIG["page_load_wait"])
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+    
+    def claim(self, content_id, persistent=True):
+        """
+        领取一条内容：本次运行任一分片处理过、或往次运行已处理完成时返回False
+        persistent=False 用于无真实ID的内容，只在本次运行内去重
+        领取本身不写入已处理索引，由 submit() 的任务全部成功后写入
+        """
+        with self._lock:
+            if content_id in self.processed_ids:
+                return False
+            self.processed_ids.add(content_id)
+        if persistent and has_seen(self.platform, content_id):
+            self.count("already_seen")
+            return False
+        self.count("total_checked")
+        return True
+    
+    def wants_text(self):
+        return self.text_sink.saved < self.target_texts
+    
+    def wants_more(self, wait_in_flight=False):
+        """文本或图片任一未达到全局目标"""
+        return self.wants_text() or self.image_manager.wants_more(wait_in_flight=wait_in_flight)
+    
+    def submit(self, content_id, content, text_data, img_urls, min_length=0, persistent=True):
+        """
+        提交一条已领取的内容：长度超过 min_length 的文本送情绪分析（近重复文本只计数），前3张图片送下载
+        文本与图片都处理成功后才把 content_id 写入已处理索引
+        """
+        self._track(content_id, persistent)
+        complete = True
+        if content and len(content) > min_length:
+            if not self.wants_text():
+                complete = False
+            elif is_near_duplicate(content):
+                self.count("near_duplicates")
+            else:
+                self._add_task(content_id)
+                self.analysis_pool.submit(self.platform, content_id, content, text_data)
         
-        if "login" in driver.current_url.lower():
-            print("⚠️ 需要登录，请先完成登录")
-            return stats
+        for idx, url in enumerate(img_urls[:3]):
+            if has_seen(image_namespace(self.platform), f"{content_id}_{idx}"):
+                continue
+            self._add_task(content_id)
+            if not self.image_manager.submit(self.platform, url, content_id, idx):
+                # 图片名额已满，剩余图片未下载
+                self._task_done(content_id, False)
+                complete = False
+                break
         
-        scroll_count = 0
-        max_scrolls = CRAWL_CONFIG["max_pages"] * 5
+        # 结束 _track 占用的任务
+        self._task_done(content_id, complete)
+    
+    def _track(self, content_id, persistent):
+        with self._lock:
+            self._open[content_id] = {"remaining": 1, "ok": True, "persistent": persistent}
+    
+    def _add_task(self, content_id):
+        with self._lock:
+            self._open[content_id]["remaining"] += 1
+    
+    def _task_done(self, content_id, ok):
+        """一项文本或图片任务结束；该内容的任务全部结束且都成功时写入已处理索引"""
+        with self._lock:
+            entry = self._open.get(content_id)
+            if entry is None:
+                return
+            entry["ok"] = entry["ok"] and ok
+            entry["remaining"] -= 1
+            if entry["remaining"] > 0:
+                return
+            del self._open[content_id]
+            if not entry["ok"]:
+                self._incomplete.add(content_id)
+                return
+        if entry["persistent"]:
+            mark_seen(self.platform, content_id)
+    
+    def _on_text_done(self, item, ok):
+        """文本分析的最终结果（分析线程中调用）：只有成功分析的文本才收录进近重复索引"""
+        if ok:
+            remember_text(item.content, item.platform, item.content_id)
+        self._task_done(item.content_id, ok)
+    
+    def _on_image_done(self, post_id, ok):
+        """图片下载结束（下载线程中调用）"""
+        self._task_done(post_id, ok)
+    
+    def position(self, shard, default):
+        with self._lock:
+            return self.positions.get(shard, default)
+    
+    def set_position(self, shard, value):
+        with self._lock:
+            self.positions[shard] = value
+    
+    def progress(self):
+        return (f"文本 {self.text_sink.saved}/{self.target_texts} | 分析中 {self.analysis_pool.pending} | "
+                f"图片 {self.image_manager.completed}/{self.target_images}")
+    
+    def _checkpoint_state(self):
+        with self._lock:
+            # 未处理完整或仍在处理中的ID不写入去重集合，续爬时可重新领取（待分析文本另由 pending 恢复）
+            processed_ids = sorted(self.processed_ids - self._incomplete - set(self._open))
+            positions = dict(self.positions)
+            persistent = {cid: entry["persistent"] for cid, entry in self._open.items()}
+        return {
+            "shard_count": self.shard_count,
+            "positions": positions,
+            "stats": {**self.stats, "images_downloaded": self.image_manager.completed},
+            "processed_ids": processed_ids,
+            "pending": [{**item._asdict(), "persistent": persistent.get(item.content_id, True)}
+                        for item in self.analysis_pool.pending_items()],
+        }
+    
+    def save_checkpoint(self, force=False):
+        # 多个分片可能同时触发写入，串行化以免临时文件互相覆盖
+        with self._checkpoint_lock:
+            if force:
+                self.checkpoint.save(self._checkpoint_state())
+            else:
+                self.checkpoint.maybe_save(self._checkpoint_state)
+    
+    def finish(self):
+        """所有分片结束后等待剩余分析与下载完成"""
+        if self.analysis_pool.pending:
+            print(f"\n→ 等待剩余 {self.analysis_pool.pending} 条文本完成情绪分析...")
+        self.analysis_pool.drain()
+        self.image_manager.drain()
+        self.stats["images_downloaded"] = self.image_manager.completed
+        self.finished = True
+    
+    def close(self):
+        self.analysis_pool.shutdown()
+        self.image_manager.shutdown()
+        self.stats["images_downloaded"] = self.image_manager.completed
+        # 还有未得到分析结果的文本（被延后或未处理完）时保留断点，--resume 时重新提交
+        if self.finished and not self.analysis_pool.pending_items():
+            self.checkpoint.clear()
+        else:
+            self.save_checkpoint(force=True)
+            print(f"→ 断点已保存：{self.checkpoint.path}（使用 --resume 继续）")
+
+
+def _crawl_xiaohongshu_shard(driver, coordinator, shard=0, shard_count=1):
+    """单个浏览器爬取小红书的一个频道"""
+    channels = XHS_CONFIG["channels"]
+    explore_url = XHS_CONFIG["explore_url"]
+    if shard_count > 1:
+        explore_url = f"{explore_url}?channel_id={channels[shard % len(channels)]}"
+    label = f"[{shard + 1}/{shard_count}] " if shard_count > 1 else ""
+    
+    print(f"→ {label}访问探索页面：{explore_url}")
+    driver.get(explore_url)
+    wait_for_document_ready(driver)
+    wait_for_new_elements(driver, XHS_CARD_CSS, 0, name="feed_cards")
+    
+    if "login" in driver.current_url.lower():
+        print("⚠️ 需要登录，请先完成登录")
+        return
+    
+    fast = CRAWL_CONFIG["xhs_extract"] == "fast"
+    feed_offset = 0
+    feed = iter_feed_cards(driver, XHS_FEED_CSS, link_selector="a[href*='/explore/']",
+                           start=coordinator.position(shard, 0))
+    
+    for scroll_count, new_cards in feed:
+        if not coordinator.wants_more(wait_in_flight=True):
+            break
+        print(f"\n--- {label}滚动 {scroll_count} | 新卡片 {len(new_cards)} | {coordinator.progress()} ---")
         
-        while (saved_texts < target_texts or saved_images < target_images) and scroll_count < max_scrolls:
-            scroll_count += 1
-            print(f"\n--- 滚动 {scroll_count} | 文本 {saved_texts}/{target_texts} | 图片 {saved_images}/{target_images} ---")
-            
-            post_cards = []
-            selectors = [
-                "//section[contains(@class, 'note-item')]",
-                "//div[contains(@class, 'note-item')]",
-                "//a[contains(@href, '/explore/')]",
-            ]
-            
-            for selector in selectors:
-                try:
-                    post_cards = driver.find_elements(By.XPATH, selector)
-                    if post_cards:
+        # 快速模式：带正文的笔记直接读取页面内嵌的信息流数据，不点开
+        if fast:
+            records, feed_offset = extract_xhs_feed_notes(driver, feed_offset)
+            if records is None:
+                print("⚠️ 页面没有内嵌信息流数据，改为逐条点开笔记")
+                fast = False
+            else:
+                for record in records:
+                    if not coordinator.wants_more():
                         break
-                except:
-                    continue
-            
-            if not post_cards:
-                print("⚠️ 未找到帖子")
+                    consume_record(coordinator, record)
+        
+        # 已从信息流数据取得的笔记在 claim 时跳过，其余才点开
+        for card, href in new_cards:
+            if not coordinator.wants_more():
                 break
             
-            for card in post_cards:
-                if saved_texts >= target_texts and saved_images >= target_images:
-                    break
+            post_id = xhs_post_id(href)
+            if not post_id:
+                continue
+            
+            try:
+                if not coordinator.claim(post_id):
+                    continue
                 
-                try:
-                    card_href = card.get_attribute("href") or ""
-                    post_id_match = re.search(r'/explore/([a-zA-Z0-9]+)', card_href)
-                    if not post_id_match:
-                        continue
-                    
-                    post_id = post_id_match.group(1)
-                    if post_id in processed_ids:
-                        continue
-                    
-                    processed_ids.add(post_id)
-                    stats["total_checked"] += 1
-                    
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", card)
-                    time.sleep(0.5)
-                    driver.execute_script("arguments[0].click();", card)
-                    time.sleep(2)
-                    
-                    content = ""
-                    content_selectors = [
-                        "//div[contains(@class, 'note-text')]//span",
-                        "//div[contains(@class, 'desc')]//span",
-                    ]
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", card)
+                driver.execute_script("arguments[0].click();", card)
+                
+                content = ""
+                content_selectors = [
+                    "//div[contains(@class, 'note-text')]//span",
+                    "//div[contains(@class, 'desc')]//span",
+                ]
+                # 弹窗内的元素逐个查找，缺失时立即返回而不是等满隐式等待
+                with no_implicit_wait(driver):
+                    wait_for_modal_open(driver, [(By.XPATH, sel) for sel in content_selectors])
                     
                     for sel in content_selectors:
-                        try:
-                            elem = WebDriverWait(driver, 3).until(
-                                EC.presence_of_element_located((By.XPATH, sel))
-                            )
-                            content = elem.text.strip()
-                            if content and len(content) > 10:
-                                break
-                        except:
-                            continue
+                        elems = driver.find_elements(By.XPATH, sel)
+                        content = elems[0].text.strip() if elems else ""
+                        if content and len(content) > 10:
+                            break
                     
-                    if content and saved_texts < target_texts:
-                        should_save, emotion_data = filter_text(content, post_id)
-                        
-                        if should_save:
-                            text_data = {
-                                "platform": "xiaohongshu",
-                                "post_id": post_id,
-                                "content": content,
-                                "crawl_time": time.strftime("%Y-%m-%d %H:%M:%S")
-                            }
-                            save_filtered_text("xiaohongshu", text_data, emotion_data)
-                            saved_texts += 1
-                            stats["texts_saved"] += 1
-                            dominant = emotion_data.get("dominant", "?")
-                            print(f"  ✓ 文本已保存 [{saved_texts}/{target_texts}] 主情绪: {dominant}")
-                        else:
-                            print(f"  ✗ 文本不符合情绪条件，跳过")
+                    img_urls = []
+                    try:
+                        img_elements = driver.find_elements(By.XPATH, 
+                            "//div[contains(@class, 'swiper')]//img[@src]")
+                        for img in img_elements:
+                            src = img.get_attribute("src")
+                            if src and "xhscdn" in src and "avatar" not in src.lower():
+                                img_urls.append(src)
+                    except:
+                        pass
                     
-                    if saved_images < target_images:
-                        img_urls = []
-                        try:
-                            img_elements = driver.find_elements(By.XPATH, 
-                                "//div[contains(@class, 'swiper')]//img[@src]")
-                            for img in img_elements:
-                                src = img.get_attribute("src")
-                                if src and "xhscdn" in src and "avatar" not in src.lower():
-                                    img_urls.append(src)
-                        except:
-                            pass
-                        
-                        for idx, url in enumerate(img_urls[:3]):
-                            if saved_images >= target_images:
-                                break
-                            filepath = save_image_for_local_analysis("xiaohongshu", url, post_id, idx)
-                            if filepath:
-                                saved_images += 1
-                                stats["images_downloaded"] += 1
-                                print(f"  ✓ 图片已下载 [{saved_images}/{target_images}]")
+                    coordinator.submit(post_id, content, {
+                        "platform": "xiaohongshu",
+                        "post_id": post_id,
+                        "content": content,
+                        "crawl_time": time.strftime("%Y-%m-%d %H:%M:%S")
+                    }, img_urls)
                     
                     try:
                         close_btn = driver.find_element(By.XPATH, "//div[contains(@class, 'close')]")
                         close_btn.click()
                     except:
                         driver.execute_script("window.history.back();")
-                    
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    print(f"  处理失败: {str(e)[:50]}")
-                    continue
-            
+                
+                wait_for_modal_close(driver, XHS_NOTE_TEXT)
+                coordinator.save_checkpoint()
+                
+            except StaleElementReferenceException:
+                print("  卡片已被页面回收，跳过")
+            except Exception as e:
+                print(f"  处理失败: {str(e)[:50]}")
+        
+        coordinator.set_position(shard, scroll_count)
+        coordinator.save_checkpoint(force=True)
+
+
+def _crawl_weibo_shard(driver, coordinator, shard=0, shard_count=1):
+    """单个浏览器爬取微博：第 shard+1 页起，每隔 shard_count 页取一页"""
+    page = coordinator.position(shard, shard + 1)
+    label = f"[{shard + 1}/{shard_count}] " if shard_count > 1 else ""
+    
+    while coordinator.wants_more(wait_in_flight=True) and page <= CRAWL_CONFIG["max_pages"]:
+        print(f"\n--- {label}第 {page} 页 | {coordinator.progress()} ---")
+        
+        url = f"{WEIBO_CONFIG['home_url']}?page={page}"
+        driver.get(url)
+        wait_for_document_ready(driver)
+        card_count = wait_for_new_elements(driver, WEIBO_CARD_CSS, 0, name="feed_cards")
+        
+        # 滚动触发懒加载：新卡片出现后立即继续，没有新卡片说明已到页底
+        for i in range(3):
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(CRAWL_CONFIG["scroll_pause"])
+            new_count = wait_for_new_elements(driver, WEIBO_CARD_CSS, card_count, timeout=1.5, name="lazy_cards")
+            if new_count <= card_count:
+                break
+            card_count = new_count
         
-        print(f"\n{'='*60}")
-        print(f"小红书爬取完成！")
-        print(f"检查总数: {stats['total_checked']} | 保存文本: {stats['texts_saved']} | 下载图片: {stats['images_downloaded']}")
-        print(f"{'='*60}")
+        # 整页卡片一次取回，不再逐卡片访问元素
+        weibo_cards = extract_weibo_cards(driver, WEIBO_CARD_CSS)
+        if not weibo_cards:
+            print(f"第 {page} 页未找到微博")
+            break
         
-        return stats
-    
-    except Exception as e:
-        print(f"小红书爬取失败：{str(e)}")
-        return stats
+        print(f"{label}本页找到 {len(weibo_cards)} 条微博")
+        
+        for card_index, card in enumerate(weibo_cards):
+            if not coordinator.wants_more():
+                break
+            
+            real_mid = card["mid"]
+            mid = real_mid or f"weibo_{page}_{card_index}"
+            
+            # 无mid的卡片只有页内编号，不写入跨运行索引
+            if not coordinator.claim(mid, persistent=bool(real_mid)):
+                continue
+            
+            content = card["content"]
+            coordinator.submit(mid, content, {
+                "platform": "weibo",
+                "mid": mid,
+                "nick_name": card["nick_name"],
+                "content": content,
+                "crawl_time": time.strftime("%Y-%m-%d %H:%M:%S")
+            }, card["image_urls"], min_length=10, persistent=bool(real_mid))
+            
+            coordinator.save_checkpoint()
+        
+        page += shard_count
+        coordinator.set_position(shard, page)
+        coordinator.save_checkpoint(force=True)
+
+
+SHARD_CRAWLERS = {
+    "xiaohongshu": _crawl_xiaohongshu_shard,
+    "weibo": _crawl_weibo_shard,
+}
 
+PLATFORM_NAMES = {"xiaohongshu": "小红书", "weibo": "微博"}
 
-def crawl_weibo(driver, target_texts=None, target_images=None):
+
+def crawl_sharded(platform, drivers, target_texts=None, target_images=None, resume=False, mode=None):
     """
-    爬取微博热门
+    用多个浏览器并行爬取同一平台
+    微博按页码交错分片，小红书每个浏览器一个频道；配额与去重由 CrawlCoordinator 统一管理
+    mode="api" 时从平台JSON接口取数据（见 api_harvest.py），否则解析页面DOM
     逻辑：爬取 → 情绪筛选 → 符合条件才存储
     """
+    mode = mode or CRAWL_CONFIG["mode"]
+    name = PLATFORM_NAMES[platform]
     print("=" * 60)
-    print("开始爬取微博数据...")
+    print(f"开始爬取{name}数据..." + ("（接口模式）" if mode == "api" else "")
+          + (f"（{len(drivers)} 个浏览器并行）" if len(drivers) > 1 else ""))
     print("=" * 60)
     
-    saved_texts = 0
-    saved_images = 0
     target_texts = target_texts or CRAWL_CONFIG["target_texts"]
     target_images = target_images or CRAWL_CONFIG["target_images"]
-    processed_ids = set()
-    
-    stats = {"total_checked": 0, "texts_saved": 0, "images_downloaded": 0}
+    coordinator = CrawlCoordinator(platform, target_texts, target_images,
+                                   shard_count=len(drivers), resume=resume)
+    crawl_shard = (HARVESTERS if mode == "api" else SHARD_CRAWLERS)[platform]
+    stats = coordinator.stats
     
     try:
-        page = 1
+        coordinator.resume_pending()
         
-        while (saved_texts < target_texts or saved_images < target_images) and page <= CRAWL_CONFIG["max_pages"]:
-            print(f"\n--- 第 {page} 页 | 文本 {saved_texts}/{target_texts} | 图片 {saved_images}/{target_images} ---")
-            
-            url = f"{WEIBO_CONFIG['home_url']}?page={page}"
-            driver.get(url)
-            time.sleep(CRAWL_CONFIG["page_load_wait"])
-            
-            for i in range(3):
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
-            
-            try:
-                weibo_cards = WebDriverWait(driver, 10).until(
-                    EC.presence_of_all_elements_located((By.XPATH, 
-                        "//div[contains(@class, 'card-wrap') and not(contains(@class, 'ad'))] | //article[contains(@class, 'Feed')]"))
-                )
-            except:
-                print(f"第 {page} 页未找到微博")
-                break
-            
-            print(f"本页找到 {len(weibo_cards)} 条微博")
-            
-            for card in weibo_cards:
-                if saved_texts >= target_texts and saved_images >= target_images:
-                    break
-                
-                try:
-                    mid = card.get_attribute("mid") or card.get_attribute("data-mid") or f"weibo_{page}_{len(processed_ids)}"
-                    
-                    if mid in processed_ids:
-                        continue
-                    
-                    processed_ids.add(mid)
-                    stats["total_checked"] += 1
-                    
-                    content = ""
+        if len(drivers) == 1:
+            crawl_shard(drivers[0], coordinator)
+        else:
+            with ThreadPoolExecutor(max_workers=len(drivers), thread_name_prefix=f"{platform}-shard") as executor:
+                futures = {
+                    executor.submit(crawl_shard, driver, coordinator, shard, len(drivers)): shard
+                    for shard, driver in enumerate(drivers)
+                }
+                for future in as_completed(futures):
                     try:
-                        content_elem = card.find_element(By.XPATH, 
-                            ".//p[contains(@class, 'txt')] | .//div[contains(@class, 'detail_wbtext')]")
-                        content = content_elem.text.strip()
-                    except:
-                        pass
-                    
-                    if content and len(content) > 10 and saved_texts < target_texts:
-                        should_save, emotion_data = filter_text(content, mid)
-                        
-                        if should_save:
-                            try:
-                                user_elem = card.find_element(By.XPATH, ".//a[contains(@class, 'name') or @nick-name]")
-                                nick_name = user_elem.get_attribute("nick-name") or user_elem.text.strip()
-                            except:
-                                nick_name = "未知"
-                            
-                            text_data = {
-                                "platform": "weibo",
-                                "mid": mid,
-                                "nick_name": nick_name,
-                                "content": content,
-                                "crawl_time": time.strftime("%Y-%m-%d %H:%M:%S")
-                            }
-                            save_filtered_text("weibo", text_data, emotion_data)
-                            saved_texts += 1
-                            stats["texts_saved"] += 1
-                            dominant = emotion_data.get("dominant", "?")
-                            print(f"  ✓ 文本已保存 [{saved_texts}/{target_texts}] 主情绪: {dominant} | {nick_name}")
-                        else:
-                            pass
-                    
-                    if saved_images < target_images:
-                        img_urls = []
-                        try:
-                            img_elements = card.find_elements(By.XPATH, ".//img[contains(@src, 'sinaimg.cn')]")
-                            for img in img_elements:
-                                src = img.get_attribute("src")
-                                if src:
-                                    large_src = re.sub(r'(orj\d+|mw\d+|thumb\d+)', 'large', src)
-                                    img_urls.append(large_src)
-                        except:
-                            pass
-                        
-                        for idx, url in enumerate(img_urls[:3]):
-                            if saved_images >= target_images:
-                                break
-                            filepath = save_image_for_local_analysis("weibo", url, mid, idx)
-                            if filepath:
-                                saved_images += 1
-                                stats["images_downloaded"] += 1
-                                print(f"  ✓ 图片已下载 [{saved_images}/{target_images}]")
-                    
-                except Exception as e:
-                    continue
-            
-            page += 1
+                        future.result()
+                    except Exception as e:
+                        print(f"⚠️ 分片 {futures[future] + 1} 异常退出：{str(e)[:50]}")
+        
+        coordinator.finish()
         
         print(f"\n{'='*60}")
-        print(f"微博爬取完成！")
-        print(f"检查总数: {stats['total_checked']} | 保存文本: {stats['texts_saved']} | 下载图片: {stats['images_downloaded']}")
+        print(f"{name}爬取完成！")
+        print(f"检查总数: {stats['total_checked']} | 已处理跳过: {stats['already_seen']} | 近重复跳过: {stats['near_duplicates']} | 保存文本: {stats['texts_saved']} | 下载图片: {stats['images_downloaded']}")
         print(f"{'='*60}")
         
         return stats
     
     except Exception as e:
-        print(f"微博爬取失败：{str(e)}")
+        print(f"{name}爬取失败：{str(e)}")
         return stats
+    
+    finally:
+        coordinator.close()
+
+
+def crawl_xiaohongshu(driver, target_texts=None, target_images=None, resume=False):
+    """
+    爬取小红书
+    逻辑：爬取 → 情绪筛选 → 符合条件才存储
+    """
+    return crawl_sharded("xiaohongshu", [driver], target_texts, target_images, resume)
+
+
+def crawl_weibo(driver, target_texts=None, target_images=None, resume=False):
+    """
+    爬取微博热门
+    逻辑：爬取 → 情绪筛选 → 符合条件才存储
+    """
+    return crawl_sharded("weibo", [driver], target_texts, target_images, resume)
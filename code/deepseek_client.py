@@ -0,0 +1,240 @@
+"""
+DeepSeek 共享客户端
+- 令牌桶限流：每分钟请求数（RPM）与每分钟token数（TPM）
+- AIMD自适应并发：延迟正常且成功时并发+1/并发，遇到429/5xx或延迟过高时减半
+- 429/5xx/网络错误按带抖动的指数退避重试，优先遵守 Retry-After
+- 限流器状态可在运行统计中展示
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from config import EMOTION_CONFIG, DEEPSEEK_CLIENT_CONFIG
+
+
+class DeepSeekUnavailable(Exception):
+    """重试耗尽仍未成功"""
+
+
+class TokenBucket:
+    """令牌桶：容量为每分钟额度，按秒匀速补充"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _refill_locked(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1.0):
+        """取出amount个令牌，不足时阻塞等待；返回等待秒数"""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill_locked()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    self.waited += waited
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def refund(self, amount):
+        """预估用量多于实际时退回差额"""
+        with self._lock:
+            self._refill_locked()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def level(self):
+        with self._lock:
+            self._refill_locked()
+            return self.tokens
+
+
+class AdaptiveConcurrency:
+    """AIMD并发控制：加性增、乘性减"""
+
+    def __init__(self, initial, minimum, maximum, latency_target):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.decreases = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, overloaded=False):
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded or (latency is not None and latency > self.latency_target):
+                self.limit = max(self.minimum, self.limit / 2)
+                self.decreases += 1
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+def _retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(prompt, max_tokens):
+    """粗略估计一次请求消耗的token数（中文约1字1token）"""
+    return len(prompt) + max_tokens
+
+
+class DeepSeekClient:
+    """线程安全的DeepSeek聊天接口客户端"""
+
+    def __init__(self, config=None):
+        config = config or DEEPSEEK_CLIENT_CONFIG
+        self.requests_bucket = TokenBucket(config["requests_per_minute"])
+        self.tokens_bucket = TokenBucket(config["tokens_per_minute"])
+        self.concurrency = AdaptiveConcurrency(
+            initial=config["initial_concurrency"],
+            minimum=1,
+            maximum=config["max_concurrency"],
+            latency_target=config["latency_target"],
+        )
+        self.max_retries = config["max_retries"]
+        self.backoff = config["backoff"]
+        self.max_backoff = config["max_backoff"]
+        self.timeout = config["timeout"]
+        self.session = requests.Session()
+        self.counters = {"requests": 0, "succeeded": 0, "retried": 0, "throttled": 0,
+                         "server_errors": 0, "bad_responses": 0, "failed": 0, "tokens": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def chat(self, prompt, max_tokens, temperature=0.3):
+        """
+        发送一次对话请求，返回回复文本
+        429/5xx/网络错误自动重试，重试耗尽时抛出 DeepSeekUnavailable
+        """
+        estimated = estimate_tokens(prompt, max_tokens)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            self.requests_bucket.acquire()
+            self.tokens_bucket.acquire(estimated)
+            self.concurrency.acquire()
+            self._count("requests")
+            start = time.monotonic()
+            retry_after = None
+            try:
+                response = self.session.post(
+                    EMOTION_CONFIG["deepseek_api_url"],
+                    headers={
+                        "Authorization": f"Bearer {EMOTION_CONFIG['deepseek_api_key']}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": EMOTION_CONFIG["deepseek_model"],
+                        "messages": [{"role": "user", "content": prompt}],
+                        "temperature": temperature,
+                        "max_tokens": max_tokens
+                    },
+                    timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                self.concurrency.release(overloaded=True)
+                last_error = str(e)[:50]
+            else:
+                latency = time.monotonic() - start
+                status = response.status_code
+                if status == 200:
+                    self.concurrency.release(latency=latency)
+                    try:
+                        result = response.json()
+                        content = result["choices"][0]["message"]["content"].strip()
+                    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                        # 网关偶尔返回200但正文不是JSON（或被截断），按可重试错误处理
+                        self._count("bad_responses")
+                        last_error = "响应不是有效的JSON"
+                    else:
+                        used = (result.get("usage") or {}).get("total_tokens")
+                        if used is not None:
+                            self.tokens_bucket.refund(max(0, estimated - used))
+                        self._count("succeeded")
+                        self._count("tokens", used or estimated)
+                        return content
+                else:
+                    overloaded = status == 429 or status >= 500
+                    self.concurrency.release(latency=latency, overloaded=overloaded)
+                    last_error = f"HTTP {status}"
+                    if not overloaded:
+                        self._count("failed")
+                        raise DeepSeekUnavailable(last_error)
+                    self._count("throttled" if status == 429 else "server_errors")
+                    retry_after = _retry_after_seconds(response)
+
+            if attempt < self.max_retries:
+                self._count("retried")
+                delay = retry_after
+                if delay is None:
+                    delay = min(self.max_backoff, self.backoff * (2 ** attempt)) * (0.5 + random.random())
+                time.sleep(delay)
+
+        self._count("failed")
+        raise DeepSeekUnavailable(last_error)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters.update({
+            "concurrency_limit": round(self.concurrency.limit, 1),
+            "in_flight": self.concurrency.in_flight,
+            "concurrency_decreases": self.concurrency.decreases,
+            "rpm_available": round(self.requests_bucket.level(), 1),
+            "tpm_available": round(self.tokens_bucket.level()),
+            "limiter_wait_seconds": round(self.requests_bucket.waited + self.tokens_bucket.waited, 1),
+        })
+        return counters
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_deepseek_client():
+    """获取进程内共享的客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DeepSeekClient()
+        return _client
+
+
+def peek_deepseek_client():
+    """返回已创建的客户端，未使用过时返回None（用于统计展示）"""
+    return _client
@@ -0,0 +1,94 @@
+"""
+页面数据批量提取
+每页只执行一次 JavaScript，在浏览器内遍历全部卡片并返回JSON，
+替代逐卡片 get_attribute / find_element 的多次 WebDriver 往返
+- 微博：卡片的 mid、正文、昵称、图片
+- 小红书：页面内嵌的信息流数据中已带正文的笔记
+"""
+
+import json
+import re
+from api_harvest import parse_xhs_note
+
+# 选择器与 crawler_utils 中原先逐卡片使用的 XPath 一一对应
+_WEIBO_CARDS_JS = """
+    var cards = document.querySelectorAll(arguments[0]);
+    var result = [];
+    for (var i = 0; i < cards.length; i++) {
+        var card = cards[i];
+        var textElem = card.querySelector("p[class*='txt'], div[class*='detail_wbtext']");
+        var userElem = card.querySelector("a[class*='name'], a[nick-name]");
+        var images = card.querySelectorAll("img[src*='sinaimg.cn']");
+        var imageUrls = [];
+        for (var j = 0; j < images.length; j++) {
+            if (images[j].src) imageUrls.push(images[j].src);
+        }
+        result.push({
+            mid: card.getAttribute('mid') || card.getAttribute('data-mid') || null,
+            content: textElem ? textElem.innerText.trim() : '',
+            nick_name: userElem ? (userElem.getAttribute('nick-name') || userElem.innerText.trim()) : '',
+            image_urls: imageUrls
+        });
+    }
+    return result;
+"""
+
+_WEIBO_THUMB_RE = re.compile(r"(orj\d+|mw\d+|thumb\d+)")
+
+
+def extract_weibo_cards(driver, card_selector):
+    """
+    一次往返取出当前页全部微博卡片
+    :return: [{mid, content, nick_name, image_urls}]，mid 可能为None，图片已换成大图地址
+    """
+    cards = driver.execute_script(_WEIBO_CARDS_JS, card_selector) or []
+    for card in cards:
+        card["nick_name"] = card.get("nick_name") or "未知"
+        card["image_urls"] = [_WEIBO_THUMB_RE.sub("large", url) for url in card.get("image_urls") or []]
+    return cards
+
+
+# 小红书首页的信息流数据保存在 window.__INITIAL_STATE__.feed.feeds（Vue响应式对象），
+# 首屏由服务端渲染写入，之后每次滚动加载的 homefeed 响应也会追加到这里
+_XHS_FEEDS_JS = """
+    var state = window.__INITIAL_STATE__;
+    if (!state || !state.feed || !state.feed.feeds) return null;
+    var feeds = state.feed.feeds;
+    feeds = feeds._value || feeds._rawValue || feeds.value || feeds;
+    if (!feeds.length) return JSON.stringify({total: 0, items: []});
+    return JSON.stringify({total: feeds.length, items: Array.prototype.slice.call(feeds, arguments[0])});
+"""
+
+
+def extract_xhs_feed_notes(driver, offset=0):
+    """
+    从页面内嵌的信息流数据中读取第 offset 条之后的笔记（无需点开笔记）
+    信息流条目通常只含标题与封面，只返回带正文（desc）的笔记；其余笔记不返回，由调用方点开读取
+    :return: (记录列表, 新的 offset)；页面没有该数据时返回 (None, offset)
+    """
+    try:
+        raw = driver.execute_script(_XHS_FEEDS_JS, offset)
+    except Exception:
+        return None, offset
+    if not raw:
+        return None, offset
+    data = json.loads(raw)
+    # 切换频道等情况下列表会被重置
+    if data["total"] < offset:
+        return extract_xhs_feed_notes(driver, 0)
+    records = (parse_xhs_note(item) for item in data["items"] if _has_desc(item))
+    return [record for record in records if record], data["total"]
+
+
+def _has_desc(item):
+    note = item.get("noteCard") or item.get("note_card") or {}
+    return bool((note.get("desc") or "").strip())
+
+
+_XHS_POST_ID_RE = re.compile(r"/explore/([a-zA-Z0-9]+)")
+
+
+def xhs_post_id(href):
+    """从笔记链接中取出笔记ID，不是笔记链接时返回None"""
+    match = _XHS_POST_ID_RE.search(href or "")
+    return match.group(1) if match else None
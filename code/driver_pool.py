@@ -0,0 +1,71 @@
+"""
+浏览器池
+- 并行启动 N 个独立的 Chrome 实例，各自保持登录状态
+- crawl 模式下每个实例使用独立的用户目录（Chrome 不允许多个实例共用同一目录）
+- 登录时第一个浏览器扫码并保存会话，其余浏览器直接恢复该会话
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from config import BROWSER_CONFIG
+from login_utils import create_chrome_driver
+
+
+class DriverPool:
+    """一组独立的浏览器驱动，支持 with 语句自动关闭"""
+
+    def __init__(self, size=None, profile=None, capture_network=False):
+        self.size = max(1, size or BROWSER_CONFIG["pool_size"])
+        self.profile = profile
+        self.capture_network = capture_network
+        self.drivers = []
+
+    def _user_data_dir(self, index):
+        base = BROWSER_CONFIG["user_data_dir"]
+        return base if index == 0 else f"{base}_{index}"
+
+    def _create(self, index):
+        driver = create_chrome_driver(self.profile, user_data_dir=self._user_data_dir(index),
+                                      capture_network=self.capture_network)
+        driver.implicitly_wait(10)
+        return driver
+
+    def start(self):
+        """并行启动所有浏览器；部分启动失败时保留成功的实例"""
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            futures = [executor.submit(self._create, i) for i in range(self.size)]
+        for i, future in enumerate(futures):
+            try:
+                self.drivers.append(future.result())
+            except Exception as e:
+                print(f"⚠️ 第 {i + 1} 个浏览器启动失败：{str(e)[:50]}")
+        if not self.drivers:
+            raise RuntimeError("没有可用的浏览器")
+        return self.drivers
+
+    def login(self, login_fn):
+        """逐个登录（后续浏览器可复用第一个保存的会话），返回登录成功的驱动"""
+        return [driver for driver in self.drivers if login_fn(driver)]
+
+    def open_new_tabs(self):
+        for driver in self.drivers:
+            driver.execute_script("window.open('');")
+            driver.switch_to.window(driver.window_handles[-1])
+
+    def quit(self):
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self.drivers = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.quit()
+        return False
+
+    def __len__(self):
+        return len(self.drivers)
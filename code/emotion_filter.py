@@ -4,119 +4,100 @@
 - 图片：检测人脸/身体 → 分析情绪 → 判断是否包含目标情绪
 """
 
-import requests
-import json
-import re
 from config import EMOTION_CONFIG
+import model_registry
+from image_loader import load_image
+from text_cache import get_text_cache, make_cache_key
+from text_prefilter import get_prefilter, neutral_result
+from text_engines import get_text_engine
 
-def analyze_text_emotion(text):
+
+def is_analyzable(text):
+    """过短的文本不做情绪分析（结果固定为None，不算分析失败）"""
+    return bool(text) and len(text.strip()) >= 5
+
+
+def analyze_text_emotions_batch(texts, batch_size=None):
     """
-    分析单条文本的情绪
-    返回: {"emotions": {...}, "dominant": "喜", "should_save": True/False}
+    批量分析多条文本的情绪：缓存 → 本地预筛 → 情绪引擎
+    远端引擎每batch_size条合并为一次请求，解析失败的条目单独重试
+    返回: 与texts等长的列表，元素为analyze_text_emotion的返回格式或None
     """
-    if not text or len(text.strip()) < 5:
-        return None
+    results = [None] * len(texts)
+    valid = [i for i, text in enumerate(texts) if is_analyzable(text)]
+    if not valid:
+        return results
     
-    api_key = EMOTION_CONFIG["deepseek_api_key"]
-    if not api_key:
-        print("⚠️ DeepSeek API未配置，跳过情绪分析")
-        return None
+    engine = get_text_engine()
     
-    emotions = EMOTION_CONFIG["emotions"]
-    prompt = f"""分析以下文本的情绪，返回JSON格式的情绪评分（0-1之间）。
-情绪类别：{', '.join(emotions)}
-
-文本：{text[:500]}
+    # 本地引擎比查缓存还快，且其结果不应混入预筛模型的训练标注
+    cache = get_text_cache() if engine.remote else None
+    keys = {}
+    if cache is not None:
+        keys = {i: make_cache_key(texts[i], engine.cache_version) for i in valid}
+        cached = cache.get_many(list(keys.values()))
+        for i in valid:
+            if keys[i] in cached:
+                results[i] = cached[keys[i]]
+        valid = [i for i in valid if results[i] is None]
+        if not valid:
+            return results
+    
+    prefilter = get_prefilter() if engine.remote else None
+    audited = []
+    if prefilter is not None:
+        remote = []
+        for i in valid:
+            skip, audit, confidence = prefilter.decide(texts[i])
+            if skip:
+                results[i] = neutral_result(confidence)
+            else:
+                remote.append(i)
+                if audit:
+                    audited.append(i)
+        valid = remote
+        if not valid:
+            return results
+    
+    scored = engine.score_batch([texts[i] for i in valid], batch_size)
+    for i, result in zip(valid, scored):
+        results[i] = result
+    
+    for i in audited:
+        prefilter.record_audit(results[i])
+    
+    if cache is not None:
+        done = [i for i in valid if results[i] is not None]
+        cache.put_many({keys[i]: results[i] for i in done}, texts={keys[i]: texts[i] for i in done})
+    
+    return results
 
-请直接返回JSON，格式如下：
-{{"喜": 0.1, "怒": 0.0, "哀": 0.0, "惧": 0.0, "惊": 0.0, "厌": 0.0, "中性": 0.9}}"""
 
-    try:
-        response = requests.post(
-            EMOTION_CONFIG["deepseek_api_url"],
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "deepseek-chat",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.3,
-                "max_tokens": 200
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            content = result["choices"][0]["message"]["content"].strip()
-            
-            json_match = re.search(r'\{[^{}]+\}', content)
-            if json_match:
-                emotion_scores = json.loads(json_match.group())
-                
-                dominant = max(emotion_scores, key=emotion_scores.get)
-                max_score = emotion_scores[dominant]
-                
-                target_emotions = EMOTION_CONFIG["target_emotions"]
-                min_score = EMOTION_CONFIG["min_score"]
-                
-                should_save = False
-                for emotion in target_emotions:
-                    if emotion in emotion_scores and emotion_scores[emotion] >= min_score:
-                        should_save = True
-                        break
-                
-                return {
-                    "emotions": emotion_scores,
-                    "dominant": dominant,
-                    "max_score": max_score,
-                    "should_save": should_save
-                }
-        
-        return None
-        
-    except Exception as e:
-        print(f"文本情绪分析失败: {str(e)[:50]}")
-        return None
+def analyze_text_emotion(text):
+    """
+    分析单条文本的情绪
+    返回: {"emotions": {...}, "dominant": "喜", "should_save": True/False}
+    """
+    return analyze_text_emotions_batch([text])[0]
 
 
-def check_has_person(image_path_or_url):
+def check_has_person(image):
     """
     检测图片中是否有人脸或人体
+    image 可以是路径、URL 或 LoadedImage（传入LoadedImage可避免重复下载/解码）
     注意：此函数需要在本地运行（需要opencv和fer库）
     在Replit上返回None，表示无法检测
     """
     try:
-        import cv2
-        import numpy as np
-        
-        if image_path_or_url.startswith("http"):
-            resp = requests.get(image_path_or_url, timeout=10)
-            img_array = np.frombuffer(resp.content, np.uint8)
-            img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        else:
-            img = cv2.imread(image_path_or_url)
+        from person_detection import detect_person
         
-        if img is None:
+        image = load_image(image)
+        if image.gray is None:
             return False
         
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        person_type, boxes = detect_person(image.gray)
         
-        if len(faces) > 0:
-            return True
-        
-        body_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_fullbody.xml'
-        )
-        bodies = body_cascade.detectMultiScale(gray, 1.1, 4)
-        
-        return len(bodies) > 0
+        return person_type is not None
         
     except ImportError:
         return None
@@ -125,29 +106,20 @@ def check_has_person(image_path_or_url):
         return None
 
 
-def analyze_image_emotion(image_path_or_url):
+def analyze_image_emotion(image):
     """
     分析图片中人脸的情绪
+    image 可以是路径、URL 或 LoadedImage
     注意：此函数需要在本地运行（需要fer库）
     返回: {"emotions": {...}, "dominant": "happy", "should_save": True/False}
     """
     try:
-        from fer import FER
-        import cv2
-        import numpy as np
-        
-        if image_path_or_url.startswith("http"):
-            resp = requests.get(image_path_or_url, timeout=10)
-            img_array = np.frombuffer(resp.content, np.uint8)
-            img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        else:
-            img = cv2.imread(image_path_or_url)
-        
-        if img is None:
+        image = load_image(image)
+        if image.bgr is None:
             return None
         
-        detector = FER(mtcnn=True)
-        result = detector.detect_emotions(img)
+        detector = model_registry.get_fer_detector(mtcnn=True)
+        result = detector.detect_emotions(image.bgr)
         
         if not result:
             return None
@@ -190,13 +162,8 @@ def analyze_image_emotion(image_path_or_url):
         return None
 
 
-def filter_text(text, content_id=None):
-    """
-    筛选文本：分析情绪，判断是否需要保存
-    返回: (should_save, emotion_data) 或 (False, None)
-    """
-    result = analyze_text_emotion(text)
-    
+def _to_filter_result(result):
+    """把分析结果转换为 (should_save, emotion_data)"""
     if result is None:
         return False, None
     
@@ -206,13 +173,32 @@ def filter_text(text, content_id=None):
     return False, result
 
 
+def filter_text(text, content_id=None):
+    """
+    筛选文本：分析情绪，判断是否需要保存
+    返回: (should_save, emotion_data) 或 (False, None)
+    """
+    return filter_texts([text])[0]
+
+
+def filter_texts(texts, batch_size=None):
+    """
+    批量筛选文本
+    返回: 与texts等长的 [(should_save, emotion_data), ...]
+    """
+    results = analyze_text_emotions_batch(texts, batch_size)
+    return [_to_filter_result(result) for result in results]
+
+
 def filter_image(image_path_or_url):
     """
     筛选图片：检测人体 → 分析情绪 → 判断是否需要保存
     返回: (should_save, emotion_data) 或 (False, None)
     注意：此函数需要在本地运行
+    图片只下载、解码一次，在人体检测与情绪分析之间共享
     """
-    has_person = check_has_person(image_path_or_url)
+    image = load_image(image_path_or_url)
+    has_person = check_has_person(image)
     
     if has_person is None:
         return None, {"status": "需要本地运行"}
@@ -220,7 +206,7 @@ def filter_image(image_path_or_url):
     if not has_person:
         return False, {"status": "无人脸/人体"}
     
-    result = analyze_image_emotion(image_path_or_url)
+    result = analyze_image_emotion(image)
     
     if result is None:
         return False, {"status": "情绪分析失败"}
@@ -0,0 +1,87 @@
+"""
+无限滚动信息流迭代器
+- 每次滚动后只返回新出现的卡片：页面内在卡片的 data-crawl-seen 属性中记录已返回的链接，
+  虚拟列表复用节点换了链接的卡片视为新卡片；已返回的链接另记一份（数量有上限），
+  回收后重新渲染的旧卡片不会再次返回
+- 连续多次滚动没有新卡片视为到达信息流末尾
+- 离开视口较远的已处理卡片移除图片/视频子树并固定高度，长时间爬取时浏览器内存保持平稳
+"""
+
+from config import CRAWL_CONFIG
+from page_waits import wait_for_changed_cards
+
+_SEEN_ATTR = "data-crawl-seen"
+
+_NEW_CARDS_JS = """
+    var selector = arguments[0], linkSelector = arguments[1], attr = arguments[2], cap = arguments[3];
+    var seen = window.__crawlSeenLinks = window.__crawlSeenLinks || {set: new Set(), order: []};
+    var cards = document.querySelectorAll(selector);
+    var result = [];
+    for (var i = 0; i < cards.length; i++) {
+        var card = cards[i];
+        var link = card.matches(linkSelector) ? card : card.querySelector(linkSelector);
+        var href = link ? link.href : '';
+        if (!href || card.getAttribute(attr) === href) continue;
+        card.setAttribute(attr, href);
+        card.removeAttribute(attr + '-pruned');
+        if (seen.set.has(href)) continue;
+        seen.set.add(href);
+        seen.order.push(href);
+        if (seen.order.length > cap) seen.set.delete(seen.order.shift());
+        result.push([card, href]);
+    }
+    return result;
+"""
+
+_PRUNE_JS = """
+    var attr = arguments[0], limit = -arguments[1] * window.innerHeight;
+    var cards = document.querySelectorAll('[' + attr + ']:not([' + attr + '-pruned])');
+    var pruned = 0;
+    for (var i = 0; i < cards.length; i++) {
+        var card = cards[i], rect = card.getBoundingClientRect();
+        if (rect.bottom > limit) continue;
+        card.style.height = rect.height + 'px';
+        card.style.overflow = 'hidden';
+        var heavy = card.querySelectorAll('img, picture, video, canvas, iframe');
+        for (var j = 0; j < heavy.length; j++) {
+            if (heavy[j].isConnected) heavy[j].remove();
+        }
+        card.setAttribute(attr + '-pruned', '1');
+        pruned++;
+    }
+    return pruned;
+"""
+
+
+def iter_feed_cards(driver, card_selector, link_selector="a[href]", start=0, max_scrolls=None,
+                    idle_limit=None, prune_screens=None, seen_cap=None):
+    """
+    逐次滚动信息流，每次产出 (滚动序号, [(卡片元素, 链接)])，只含上次滚动之后新出现的卡片
+    调用方 break 即停止滚动；连续 idle_limit 次没有新卡片或达到 max_scrolls 时结束
+    :param link_selector: 卡片内（或卡片本身）标识内容的链接，按链接去重
+    :param start: 起始滚动序号（断点续爬时沿用之前的计数）
+    :param prune_screens: 移除位于视口上方超过该屏数的卡片的图片/视频，0 表示不移除
+    :param seen_cap: 页面内最多记住的已返回链接数
+    """
+    max_scrolls = max_scrolls or CRAWL_CONFIG["max_pages"] * 5
+    idle_limit = idle_limit or CRAWL_CONFIG["feed_idle_scrolls"]
+    prune_screens = CRAWL_CONFIG["feed_prune_screens"] if prune_screens is None else prune_screens
+    seen_cap = seen_cap or CRAWL_CONFIG["feed_seen_cap"]
+
+    scroll_count = start
+    idle_scrolls = 0
+    while scroll_count < max_scrolls:
+        scroll_count += 1
+        cards = driver.execute_script(_NEW_CARDS_JS, card_selector, link_selector, _SEEN_ATTR, seen_cap) or []
+        yield scroll_count, cards
+
+        idle_scrolls = 0 if cards else idle_scrolls + 1
+        if idle_scrolls >= idle_limit:
+            print(f"→ 连续 {idle_limit} 次滚动没有新内容，已到信息流末尾")
+            return
+
+        if prune_screens:
+            driver.execute_script(_PRUNE_JS, _SEEN_ATTR, prune_screens)
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        wait_for_changed_cards(driver, card_selector, link_selector, _SEEN_ATTR,
+                               timeout=CRAWL_CONFIG["scroll_pause"] * 2, name="feed_cards")
@@ -0,0 +1,103 @@
+"""
+FER批量推理
+- 人脸检测仍逐张进行（MTCNN/Haar）
+- 多张图片的人脸裁剪统一预处理后堆叠为一个张量，一次前向计算完成情绪分类
+- 预处理与 FER.detect_emotions 保持一致，输出格式也相同：
+  每张图片一个列表，元素为 {"box": [x, y, w, h], "emotions": {...}}
+- 预处理参数取自 FER 的私有属性；FER 版本变化导致属性缺失时不猜测默认值，
+  改为逐张调用 detector.detect_emotions
+"""
+
+import cv2
+import numpy as np
+from fer import FER
+
+try:
+    from fer.fer import PADDING
+except ImportError:
+    PADDING = 40
+
+
+# 批量推理依赖的 FER 内部实现（fer 22.x）
+_REQUIRED_ATTRS = ("_FER__emotion_target_size", "_FER__offsets", "_classify_emotions", "_get_labels")
+_warned = False
+
+
+def supports_batch(detector):
+    """当前 FER 版本是否提供批量推理所需的内部属性"""
+    global _warned
+    missing = [name for name in _REQUIRED_ATTRS if not hasattr(detector, name)]
+    if missing and not _warned:
+        print(f"⚠️ 当前 FER 版本缺少 {', '.join(missing)}，改为逐张情绪识别")
+        _warned = True
+    return not missing
+
+
+def _crop_faces(detector, img, face_boxes):
+    """按FER的方式裁剪并预处理人脸，返回 (有效的box列表, 人脸数组列表)"""
+    gray_img = FER.pad(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+    target_size = detector._FER__emotion_target_size
+    x_off, y_off = detector._FER__offsets
+
+    boxes = []
+    faces = []
+    for box in face_boxes:
+        x, y, w, h = FER.tosquare(box)
+        x1, x2 = x - x_off + PADDING, x + w + x_off + PADDING
+        y1, y2 = y - y_off + PADDING, y + h + y_off + PADDING
+        x1, y1 = max(0, x1), max(0, y1)
+        gray_face = gray_img[y1:y2, x1:x2]
+        if gray_face.size == 0:
+            continue
+        try:
+            gray_face = cv2.resize(gray_face, target_size)
+        except cv2.error:
+            continue
+        gray_face = gray_face.astype("float32") / 255.0
+        gray_face = (gray_face - 0.5) * 2.0
+        boxes.append(list(box))
+        faces.append(gray_face)
+    return boxes, faces
+
+
+def detect_emotions_batch(detector, images, face_boxes=None):
+    """
+    批量情绪识别
+    :param detector: FER 实例（建议来自 model_registry.get_fer_detector）
+    :param images: BGR 图像数组列表
+    :param face_boxes: 可选，预先检测好的每张图片的人脸框列表
+    :return: 与images等长的列表，每项与 detector.detect_emotions(img) 的返回值格式相同
+    """
+    if not supports_batch(detector):
+        if face_boxes is None:
+            return [detector.detect_emotions(img) for img in images]
+        return [detector.detect_emotions(img, face_rectangles=boxes) if boxes else []
+                for img, boxes in zip(images, face_boxes)]
+
+    labels = detector._get_labels()
+    per_image_boxes = []
+    all_faces = []
+
+    for i, img in enumerate(images):
+        boxes = face_boxes[i] if face_boxes is not None else detector.find_faces(img, bgr=True)
+        boxes, faces = _crop_faces(detector, img, boxes or [])
+        per_image_boxes.append(boxes)
+        all_faces.extend(faces)
+
+    results = [[] for _ in images]
+    if not all_faces:
+        return results
+
+    batch = np.expand_dims(np.stack(all_faces, 0), -1)
+    predictions = np.asarray(detector._classify_emotions(batch))
+
+    offset = 0
+    for i, boxes in enumerate(per_image_boxes):
+        for box in boxes:
+            scores = predictions[offset]
+            offset += 1
+            results[i].append({
+                "box": box,
+                "emotions": {labels[idx]: round(float(score), 2) for idx, score in enumerate(scores)},
+            })
+    return results
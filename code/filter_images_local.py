@@ -2,23 +2,31 @@
 本地图片情绪筛选脚本
 流程：检测人脸/身体 → 分析情绪 → 符合条件才移动到filtered目录
 
-运行方式：python filter_images_local.py
+运行方式：python filter_images_local.py [--workers N] [--batch-size B]
 需要安装：pip install fer opencv-python tensorflow
 """
 
 import os
 import json
+import time
 import shutil
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 try:
     import cv2
-    from fer import FER
-    import numpy as np
+    import fer  # noqa: F401  仅检查依赖是否安装，检测器由 model_registry 加载
 except ImportError:
     print("❌ 请先安装依赖：pip install fer opencv-python tensorflow")
     exit(1)
 
+import model_registry
+from config import IMAGE_FILTER_CONFIG
+from fer_batch import detect_emotions_batch
+from person_detection import detect_person
+
 
 EMOTIONS_CN = {
     "happy": "喜",
@@ -32,39 +40,17 @@ EMOTIONS_CN = {
 
 TARGET_EMOTIONS = ["喜", "怒", "哀", "惧", "惊", "厌"]
 MIN_SCORE = 0.3
+BATCH_SIZE = IMAGE_FILTER_CONFIG["fer_batch_size"]
 
 
 def check_has_person(img):
     """检测图片中是否有人脸或人体"""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
-    face_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-    )
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-    
-    if len(faces) > 0:
-        return True, "face"
-    
-    body_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + 'haarcascade_fullbody.xml'
-    )
-    bodies = body_cascade.detectMultiScale(gray, 1.1, 4)
-    
-    if len(bodies) > 0:
-        return True, "body"
-    
-    return False, None
+    person_type, boxes = detect_person(img)
+    return person_type is not None, person_type
 
 
-def analyze_emotion(img, detector):
-    """分析图片中人脸的情绪"""
-    result = detector.detect_emotions(img)
-    
-    if not result:
-        return None
-    
-    emotions = result[0]["emotions"]
+def _build_emotion_result(emotions):
+    """按目标情绪与最低分数构造分析结果"""
     dominant = max(emotions, key=emotions.get)
     max_score = emotions[dominant]
     
@@ -83,7 +69,109 @@ def analyze_emotion(img, detector):
     }
 
 
-def filter_images(platform):
+def analyze_emotions_batch(imgs, detector):
+    """批量分析多张图片中人脸的情绪（所有人脸一次前向计算），无人脸的位置为None"""
+    batch_results = detect_emotions_batch(detector, imgs)
+    return [_build_emotion_result(result[0]["emotions"]) if result else None
+            for result in batch_results]
+
+
+def analyze_emotion(img, detector):
+    """分析图片中人脸的情绪"""
+    return analyze_emotions_batch([img], detector)[0]
+
+
+def classify_images(filepaths, detector):
+    """
+    对一批图片做 人体检测 → 批量情绪分析
+    返回与filepaths等长的 [(outcome, emotion_data), ...]，outcome 取值：
+    read_failed / no_person / no_emotion / filtered / rejected / error
+    """
+    outcomes = [None] * len(filepaths)
+    person_idx = []
+    person_imgs = []
+    
+    for i, filepath in enumerate(filepaths):
+        try:
+            img = cv2.imread(filepath)
+            if img is None:
+                outcomes[i] = ("read_failed", None)
+                continue
+            
+            has_person, person_type = check_has_person(img)
+            
+            if not has_person:
+                outcomes[i] = ("no_person", None)
+                continue
+            
+            person_idx.append(i)
+            person_imgs.append(img)
+        except Exception as e:
+            outcomes[i] = ("error", {"error": str(e)[:30]})
+    
+    if person_imgs:
+        try:
+            emotion_list = analyze_emotions_batch(person_imgs, detector)
+        except Exception as e:
+            emotion_list = [{"error": str(e)[:30]}] * len(person_imgs)
+        
+        for i, emotion_data in zip(person_idx, emotion_list):
+            if emotion_data is None:
+                outcomes[i] = ("no_emotion", None)
+            elif "error" in emotion_data:
+                outcomes[i] = ("error", emotion_data)
+            else:
+                outcomes[i] = ("filtered" if emotion_data["should_save"] else "rejected", emotion_data)
+    
+    return outcomes
+
+
+def classify_image(filepath, detector):
+    """对单张图片做 人体检测 → 情绪分析，返回 (outcome, emotion_data)"""
+    return classify_images([filepath], detector)[0]
+
+
+_worker_state = {}
+
+
+def _init_worker():
+    """进程池初始化：每个工作进程只构建一次检测器和级联分类器"""
+    model_registry.warm_up()
+    _worker_state["detector"] = model_registry.get_fer_detector()
+
+
+def _classify_chunk(filepaths, detector):
+    """处理一个小批次，耗时按张数平摊"""
+    start = time.perf_counter()
+    outcomes = classify_images(filepaths, detector)
+    per_image = (time.perf_counter() - start) / len(filepaths)
+    return [(outcome, emotion_data, os.getpid(), per_image) for outcome, emotion_data in outcomes]
+
+
+def _classify_chunk_in_worker(filepaths):
+    return _classify_chunk(filepaths, _worker_state["detector"])
+
+
+def _iter_classified(filepaths, workers, batch_size):
+    """按输入顺序产出 (outcome, emotion_data, worker_id, seconds)"""
+    chunks = [filepaths[i:i + batch_size] for i in range(0, len(filepaths), batch_size)]
+    
+    if workers <= 1:
+        model_registry.warm_up()
+        detector = model_registry.get_fer_detector()
+        for chunk in chunks:
+            yield from _classify_chunk(chunk, detector)
+        return
+    
+    # TensorFlow 不支持fork后复用，使用spawn启动工作进程
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker) as executor:
+        for chunk_results in executor.map(_classify_chunk_in_worker, chunks):
+            yield from chunk_results
+
+
+def filter_images(platform, workers=1, batch_size=BATCH_SIZE):
     """筛选指定平台的待处理图片"""
     pending_dir = f"./data/images/{platform}/pending"
     filtered_dir = f"./data/images/{platform}/filtered"
@@ -96,17 +184,16 @@ def filter_images(platform):
     os.makedirs(filtered_dir, exist_ok=True)
     os.makedirs(rejected_dir, exist_ok=True)
     
-    image_files = [f for f in os.listdir(pending_dir) if f.endswith(('.jpg', '.jpeg', '.png'))]
+    image_files = sorted(f for f in os.listdir(pending_dir) if f.endswith(('.jpg', '.jpeg', '.png')))
     
     if not image_files:
         print(f"⚠️ {platform} 无待处理图片")
         return
     
-    print(f"\n处理 {platform} 图片：共 {len(image_files)} 张")
+    workers = max(1, min(workers, len(image_files)))
+    print(f"\n处理 {platform} 图片：共 {len(image_files)} 张（{workers} 个进程，批大小 {batch_size}）")
     print("-" * 40)
     
-    detector = FER(mtcnn=True)
-    
     stats = {
         "total": len(image_files),
         "has_person": 0,
@@ -117,21 +204,30 @@ def filter_images(platform):
     }
     
     results = []
+    worker_stats = {}
+    started = time.perf_counter()
+    
+    filepaths = [os.path.join(pending_dir, f) for f in image_files]
+    classified = _iter_classified(filepaths, workers, max(1, batch_size))
     
-    for i, filename in enumerate(image_files, 1):
+    for i, (filename, (outcome, emotion_data, worker_id, seconds)) in enumerate(zip(image_files, classified), 1):
         filepath = os.path.join(pending_dir, filename)
+        count, busy = worker_stats.get(worker_id, (0, 0.0))
+        worker_stats[worker_id] = (count + 1, busy + seconds)
         print(f"[{i}/{len(image_files)}] {filename}...", end=" ")
         
         try:
-            img = cv2.imread(filepath)
-            if img is None:
+            if outcome == "read_failed":
                 print("读取失败")
                 stats["failed"] += 1
                 continue
             
-            has_person, person_type = check_has_person(img)
+            if outcome == "error":
+                print(f"错误: {emotion_data['error']}")
+                stats["failed"] += 1
+                continue
             
-            if not has_person:
+            if outcome == "no_person":
                 print("无人脸/人体 → 跳过")
                 shutil.move(filepath, os.path.join(rejected_dir, filename))
                 stats["rejected_no_person"] += 1
@@ -139,15 +235,13 @@ def filter_images(platform):
             
             stats["has_person"] += 1
             
-            emotion_data = analyze_emotion(img, detector)
-            
-            if emotion_data is None:
+            if outcome == "no_emotion":
                 print("情绪分析失败 → 跳过")
                 shutil.move(filepath, os.path.join(rejected_dir, filename))
                 stats["rejected_no_emotion"] += 1
                 continue
             
-            if emotion_data["should_save"]:
+            if outcome == "filtered":
                 print(f"✓ {emotion_data['dominant_cn']}({emotion_data['max_score']:.2f}) → 保存")
                 shutil.move(filepath, os.path.join(filtered_dir, filename))
                 stats["filtered"] += 1
@@ -167,6 +261,8 @@ def filter_images(platform):
             print(f"错误: {str(e)[:30]}")
             stats["failed"] += 1
     
+    elapsed = time.perf_counter() - started
+    
     print("\n" + "=" * 40)
     print(f"{platform} 处理完成！")
     print(f"  总计：{stats['total']}")
@@ -175,6 +271,10 @@ def filter_images(platform):
     print(f"  无人脸/人体：{stats['rejected_no_person']}")
     print(f"  情绪不符：{stats['rejected_no_emotion']}")
     print(f"  处理失败：{stats['failed']}")
+    print(f"  总耗时：{elapsed:.1f} 秒（{stats['total'] / max(elapsed, 1e-6):.2f} 张/秒）")
+    for n, (worker_id, (count, busy)) in enumerate(sorted(worker_stats.items()), 1):
+        rate = count / busy if busy else 0.0
+        print(f"  进程{n}（pid {worker_id}）：{count} 张，{busy:.1f} 秒，{rate:.2f} 张/秒")
     
     if results:
         result_file = os.path.join(filtered_dir, f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
@@ -185,18 +285,19 @@ def filter_images(platform):
     return stats
 
 
-def main():
+def main(workers=1, batch_size=BATCH_SIZE):
     print("=" * 60)
     print("🖼️ 本地图片情绪筛选")
     print("=" * 60)
     print(f"目标情绪：{', '.join(TARGET_EMOTIONS)}")
     print(f"最低分数：{MIN_SCORE}")
+    print(f"并行进程：{workers}")
     print("=" * 60)
     
     all_stats = {}
     
     for platform in ["xiaohongshu", "weibo"]:
-        stats = filter_images(platform)
+        stats = filter_images(platform, workers, batch_size)
         if stats:
             all_stats[platform] = stats
     
@@ -211,4 +312,11 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="本地图片情绪筛选")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"并行进程数（本机CPU核数：{os.cpu_count()}）")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="情绪分类批大小（多张图片的人脸合并为一次推理）")
+    args = parser.parse_args()
+    
+    main(workers=args.workers, batch_size=args.batch_size)
@@ -0,0 +1,206 @@
+"""
+图片并发下载
+- 每个CDN域名一个带连接池的keep-alive Session
+- 有界线程池 + 每域名并发上限
+- 失败按指数退避重试，响应流式写入磁盘
+- 按目标数预留名额，已下载数不会超过目标
+"""
+
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from config import SAVE_CONFIG, IMAGE_DOWNLOAD_CONFIG
+from seen_index import mark_seen, image_namespace
+
+
+IMAGE_REFERERS = {
+    "weibo": "https://weibo.com/",
+    "xiaohongshu": "https://www.xiaohongshu.com/",
+}
+
+CDN_PLATFORMS = {
+    "sinaimg.cn": "weibo",
+    "xhscdn.com": "xiaohongshu",
+}
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url):
+    """按域名获取共享Session（连接池复用keep-alive连接）"""
+    host = urlparse(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            pool_size = IMAGE_DOWNLOAD_CONFIG["workers"]
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            _sessions[host] = session
+        return session
+
+
+def referer_for_url(url):
+    """根据图片CDN域名推断需要携带的Referer"""
+    host = urlparse(url).netloc
+    for domain, platform in CDN_PLATFORMS.items():
+        if host.endswith(domain):
+            return IMAGE_REFERERS[platform]
+    return None
+
+
+def _is_retryable(status_code):
+    return status_code == 429 or status_code >= 500
+
+
+def download_image(image_url, filepath, referer=None):
+    """
+    流式下载单张图片到filepath，失败时退避重试
+    返回filepath，最终失败返回None
+    """
+    retries = IMAGE_DOWNLOAD_CONFIG["retries"]
+    backoff = IMAGE_DOWNLOAD_CONFIG["backoff"]
+    headers = {"Referer": referer} if referer else {}
+    tmp_path = filepath + ".part"
+    session = get_session(image_url)
+
+    for attempt in range(retries + 1):
+        try:
+            with session.get(image_url, headers=headers, stream=True,
+                             timeout=IMAGE_DOWNLOAD_CONFIG["timeout"]) as resp:
+                if resp.status_code == 200:
+                    with open(tmp_path, "wb") as f:
+                        for chunk in resp.iter_content(chunk_size=64 * 1024):
+                            f.write(chunk)
+                    os.replace(tmp_path, filepath)
+                    return filepath
+                if not _is_retryable(resp.status_code):
+                    print(f"  图片下载失败: HTTP {resp.status_code}")
+                    return None
+                error = f"HTTP {resp.status_code}"
+        except (requests.RequestException, OSError) as e:
+            error = str(e)[:30]
+
+        if attempt < retries:
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    print(f"  图片下载失败: {error}")
+    return None
+
+
+class ImageDownloadManager:
+    """
+    后台图片下载管理器
+    crawler调用submit后立即返回；在途下载达到 max_queued 时 submit 阻塞等待空位（背压）
+    completed + in_flight 不超过target，保证最终下载数不超过目标
+    """
+
+    def __init__(self, target, workers=None, per_host=None, max_queued=None, completed=0, on_done=None):
+        """on_done(post_id, ok) 在每张图片下载结束（成功或失败）后于下载线程中调用"""
+        self.target = target
+        self._on_done_image = on_done
+        self.completed = completed
+        self.failed = 0
+        self.in_flight = 0
+        self._max_queued = max_queued or IMAGE_DOWNLOAD_CONFIG["max_queued"]
+        per_host = per_host or IMAGE_DOWNLOAD_CONFIG["per_host"]
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or IMAGE_DOWNLOAD_CONFIG["workers"],
+            thread_name_prefix="image"
+        )
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+        # 条件变量：下载完成时唤醒因队列已满而等待的 submit
+        self._lock = threading.Condition()
+        self._futures = set()
+
+    def wants_more(self, wait_in_flight=False):
+        """
+        是否还需要提交新的图片（已完成 + 在途 < 目标）
+        wait_in_flight=True 时，若名额被在途下载占满则先等待其完成再判断，
+        以便失败的下载腾出名额后继续爬取补齐
+        """
+        with self._lock:
+            if self.completed + self.in_flight < self.target:
+                return True
+            if not wait_in_flight or not self.in_flight:
+                return False
+        self.drain()
+        return self.wants_more()
+
+    def submit(self, platform, image_url, post_id, index):
+        """
+        提交一张图片；队列已满时等待有下载完成，只有名额已满（达到目标）时才返回False
+        """
+        with self._lock:
+            self._lock.wait_for(lambda: self.in_flight < self._max_queued
+                                or self.completed + self.in_flight >= self.target)
+            if self.completed + self.in_flight >= self.target:
+                return False
+            self.in_flight += 1
+            host = urlparse(image_url).netloc
+            host_slot = self._host_slots[host]
+
+        future = self._executor.submit(self._download, platform, image_url, post_id, index, host_slot)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._on_done)
+        return True
+
+    def _on_done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _download(self, platform, image_url, post_id, index, host_slot):
+        save_dir = os.path.join(SAVE_CONFIG["image_path"], platform, "pending")
+        os.makedirs(save_dir, exist_ok=True)
+        filepath = os.path.join(save_dir, f"{post_id}_{index}.jpg")
+
+        try:
+            with host_slot:
+                result = download_image(image_url, filepath, IMAGE_REFERERS.get(platform))
+        except Exception as e:
+            print(f"  图片下载失败: {str(e)[:30]}")
+            result = None
+
+        with self._lock:
+            self.in_flight -= 1
+            if result:
+                mark_seen(image_namespace(platform), f"{post_id}_{index}")
+                self.completed += 1
+                print(f"  ✓ 图片已下载 [{self.completed}/{self.target}]")
+            else:
+                self.failed += 1
+            self._lock.notify_all()
+        if self._on_done_image is not None:
+            try:
+                self._on_done_image(post_id, bool(result))
+            except Exception as e:
+                print(f"  图片下载回调失败: {str(e)[:30]}")
+        return result
+
+    def drain(self, timeout=None):
+        """等待所有在途下载完成，返回是否全部完成"""
+        with self._lock:
+            futures = list(self._futures)
+        if not futures:
+            return True
+        done, not_done = wait(futures, timeout=timeout)
+        return not not_done
+
+    def shutdown(self, timeout=None):
+        drained = self.drain(timeout)
+        self._executor.shutdown(wait=drained)
@@ -0,0 +1,71 @@
+"""
+一次加载、多处复用的图片对象
+- raw bytes 最多下载/读取一次
+- BGR 数组最多解码一次，灰度图在首次使用时计算
+人体检测与情绪分析共用同一个 LoadedImage，避免重复下载和解码
+"""
+
+from image_downloader import get_session, referer_for_url
+
+
+class LoadedImage:
+    """图片的原始字节、BGR数组与灰度图（均为懒加载）"""
+
+    def __init__(self, source=None, data=None, bgr=None):
+        self.source = source
+        self._data = data
+        self._bgr = bgr
+        self._gray = None
+        self._fetched = data is not None
+        self._decoded = bgr is not None
+
+    @property
+    def is_remote(self):
+        return isinstance(self.source, str) and self.source.startswith("http")
+
+    @property
+    def data(self):
+        """原始字节；下载或读取失败时为None"""
+        if not self._fetched:
+            self._fetched = True
+            self._data = self._fetch()
+        return self._data
+
+    def _fetch(self):
+        if self.source is None:
+            return None
+        if self.is_remote:
+            referer = referer_for_url(self.source)
+            resp = get_session(self.source).get(
+                self.source, headers={"Referer": referer} if referer else {}, timeout=10
+            )
+            return resp.content if resp.status_code == 200 else None
+        with open(self.source, "rb") as f:
+            return f.read()
+
+    @property
+    def bgr(self):
+        """解码后的BGR数组；无法解码时为None"""
+        if not self._decoded:
+            self._decoded = True
+            data = self.data
+            if data:
+                import cv2
+                import numpy as np
+                self._bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        return self._bgr
+
+    @property
+    def gray(self):
+        """灰度图；无法解码时为None"""
+        if self._gray is None and self.bgr is not None:
+            import cv2
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+
+def load_image(image):
+    """接受路径、URL或已加载的 LoadedImage，统一返回 LoadedImage"""
+    if isinstance(image, LoadedImage):
+        return image
+    return LoadedImage(image)
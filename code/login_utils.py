@@ -7,28 +7,61 @@ import time
 import os
 import subprocess
 import threading
-from config import XHS_CONFIG, WEIBO_CONFIG
+from config import XHS_CONFIG, WEIBO_CONFIG, BROWSER_CONFIG, WAIT_CONFIG
+from session_store import restore_session, save_session
+from page_waits import no_implicit_wait, wait_for_document_ready, wait_for_network_idle, wait_for_condition
 
-def create_chrome_driver():
-    """创建Chrome浏览器驱动（适配Linux环境）"""
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
+
+def create_chrome_driver(profile=None, user_data_dir=None, capture_network=False):
+    """
+    创建Chrome浏览器驱动（适配Linux环境）
+    :param profile: "interactive"（默认，有界面）或 "crawl"（无头、拦截图片/字体/媒体、持久化用户目录）
+    :param user_data_dir: crawl 模式下的用户目录，默认取 BROWSER_CONFIG
+    :param capture_network: 开启 performance 日志，供接口采集模式读取CDP网络事件，网络空闲等待也改用这些事件
+    """
+    profile = profile or BROWSER_CONFIG["profile"]
+    lean = profile == "crawl"
+    
     options = webdriver.ChromeOptions()
     options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
     options.add_experimental_option("useAutomationExtension", False)
     options.add_experimental_option("prefs", {
         "profile.default_content_setting_values.cookies": 1,
-        "profile.default_content_setting_values.images": 1,
+        "profile.default_content_setting_values.images": 2 if lean else 1,
         "profile.user_agent_overrides": {
-            "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
+            "user-agent": USER_AGENT
         }
     })
     options.add_argument("--disable-gpu")
-    options.add_argument("--incognito")
     options.add_argument("--lang=zh-CN")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--ignore-certificate-errors")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("--start-maximized")
+    
+    if capture_network:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    
+    if lean:
+        user_data_dir = os.path.abspath(user_data_dir or BROWSER_CONFIG["user_data_dir"])
+        os.makedirs(user_data_dir, exist_ok=True)
+        options.add_argument("--headless=new")
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+        options.add_argument(f"--window-size={BROWSER_CONFIG['crawl_window_size']}")
+        options.add_argument(f"--user-agent={USER_AGENT}")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--mute-audio")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-component-update")
+        options.add_argument("--disable-default-apps")
+        options.add_argument("--disable-sync")
+        options.add_argument("--no-first-run")
+        options.add_argument("--renderer-process-limit=2")
+    else:
+        options.add_argument("--incognito")
+        options.add_argument("--window-size=1920,1080")
+        options.add_argument("--start-maximized")
     
     try:
         chromedriver_path = subprocess.check_output(["which", "chromedriver"]).decode().strip()
@@ -49,9 +82,99 @@ def create_chrome_driver():
             Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3] });
         """
     })
+    if lean:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BROWSER_CONFIG["blocked_url_patterns"]})
     driver.implicitly_wait(5)
+    driver.lean_profile = lean
+    driver.capture_network = capture_network
     return driver
 
+
+def is_headless(driver):
+    return getattr(driver, "lean_profile", False)
+
+
+def save_login_qr(driver, filepath):
+    """
+    无头模式下保存二维码供扫码
+    crawl 模式禁止加载图片，截图里看不到二维码，因此直接读取二维码 <img> 的地址另行保存
+    """
+    import base64
+    from image_downloader import download_image
+    
+    try:
+        qr_img = driver.find_element(By.XPATH,
+            "//img[contains(@class, 'qr') or contains(@alt, '二维码') or contains(@src, 'qr')]")
+        src = qr_img.get_attribute("src") or ""
+        if src.startswith("data:image"):
+            with open(filepath, "wb") as f:
+                f.write(base64.b64decode(src.split(",", 1)[1]))
+            return filepath
+        if src.startswith("http") and download_image(src, filepath, driver.current_url):
+            return filepath
+    except Exception:
+        pass
+    
+    driver.save_screenshot(filepath)
+    return filepath
+
+LOGIN_INDICATORS = {
+    "xiaohongshu": [
+        (By.XPATH, "//div[contains(@class, 'user') or contains(@class, 'avatar')]//img"),
+        (By.XPATH, "//a[contains(@href, '/user/profile')]"),
+        (By.XPATH, "//div[contains(@class, 'sidebar')]//img[contains(@class, 'avatar')]"),
+        (By.XPATH, "//*[contains(@class, 'reds-icon-user')]"),
+    ],
+    "weibo": [
+        (By.XPATH, "//a[contains(@class, 'gn_name')]"),
+        (By.XPATH, "//div[contains(@class, 'gn_header')]//img"),
+        (By.XPATH, "//a[contains(@href, '/profile')]"),
+        (By.XPATH, "//span[contains(@class, 'gn_name')]"),
+        (By.XPATH, "//div[contains(@class, 'WB_miniblog')]"),
+    ],
+}
+
+# 未登录时页面上的登录入口；严格检查时出现即判定未登录
+LOGIN_PROMPTS = {
+    "xiaohongshu": [
+        (By.XPATH, "//*[contains(@class, 'login-container')]"),
+        (By.XPATH, "//button[contains(., '登录')]"),
+    ],
+    "weibo": [
+        (By.XPATH, "//a[contains(@href, 'passport.weibo.com') and contains(., '登录')]"),
+    ],
+}
+
+
+def check_login_state(driver, platform, strict=False):
+    """
+    检查一次当前页面是否处于登录状态
+    :param strict: 只认页面上的登录标志元素，不以"已在首页"作为依据
+                   （恢复会话时是主动打开首页的，URL不能说明已登录）
+    :return: 命中的登录标志说明，未登录时返回None
+    """
+    current_url = driver.current_url
+    if "passport" in current_url or "login" in current_url.lower():
+        return None
+    
+    # 逐个查找标志时不走隐式等待，否则每个缺失的标志都要等满超时
+    with no_implicit_wait(driver):
+        if strict and any(driver.find_elements(*locator) for locator in LOGIN_PROMPTS.get(platform, [])):
+            return None
+        for locator in LOGIN_INDICATORS.get(platform, []):
+            if driver.find_elements(*locator):
+                return f"检测到登录成功标志！当前URL：{current_url[:50]}..."
+    
+    if strict:
+        return None
+    if platform == "xiaohongshu" and "xiaohongshu.com" in current_url and "explore" in current_url:
+        return "检测到已跳转至首页！登录成功"
+    if platform == "weibo" and "weibo.com" in current_url and ("home" in current_url or current_url.endswith("weibo.com/")):
+        return "检测到已跳转至首页！登录成功"
+    return None
+
+
 def wait_for_login_success(driver, platform, timeout=120):
     """
     自动检测扫码登录是否成功（通过页面跳转/元素变化判断）
@@ -62,67 +185,39 @@ def wait_for_login_success(driver, platform, timeout=120):
     """
     print(f"⏳ 等待扫码登录（{timeout}秒超时）...")
     start_time = time.time()
-    check_interval = 2
     
-    while time.time() - start_time < timeout:
+    def logged_in(d):
         try:
-            current_url = driver.current_url
-            
-            if platform == "xiaohongshu":
-                login_indicators = [
-                    (By.XPATH, "//div[contains(@class, 'user') or contains(@class, 'avatar')]//img"),
-                    (By.XPATH, "//a[contains(@href, '/user/profile')]"),
-                    (By.XPATH, "//div[contains(@class, 'sidebar')]//img[contains(@class, 'avatar')]"),
-                    (By.XPATH, "//*[contains(@class, 'reds-icon-user')]"),
-                ]
-                if "passport" not in current_url and "login" not in current_url.lower():
-                    for locator in login_indicators:
-                        try:
-                            element = driver.find_element(*locator)
-                            if element:
-                                print(f"✅ 检测到登录成功标志！当前URL：{current_url[:50]}...")
-                                return True
-                        except:
-                            continue
-                    if "xiaohongshu.com" in current_url and "explore" in current_url:
-                        print(f"✅ 检测到已跳转至首页！登录成功")
-                        return True
-                        
-            elif platform == "weibo":
-                if "passport" not in current_url and "login" not in current_url.lower():
-                    login_indicators = [
-                        (By.XPATH, "//a[contains(@class, 'gn_name')]"),
-                        (By.XPATH, "//div[contains(@class, 'gn_header')]//img"),
-                        (By.XPATH, "//a[contains(@href, '/profile')]"),
-                        (By.XPATH, "//span[contains(@class, 'gn_name')]"),
-                        (By.XPATH, "//div[contains(@class, 'WB_miniblog')]"),
-                    ]
-                    for locator in login_indicators:
-                        try:
-                            element = driver.find_element(*locator)
-                            if element:
-                                print(f"✅ 检测到登录成功标志！当前URL：{current_url[:50]}...")
-                                return True
-                        except:
-                            continue
-                    if "weibo.com" in current_url and ("home" in current_url or current_url.endswith("weibo.com/")):
-                        print(f"✅ 检测到已跳转至首页！登录成功")
-                        return True
-            
-            elapsed = int(time.time() - start_time)
-            if elapsed % 10 == 0:
-                print(f"⏳ 已等待 {elapsed} 秒，继续检测中...")
-                
+            return check_login_state(d, platform)
         except Exception as e:
             print(f"⚠️ 检测过程出错：{str(e)[:50]}...")
-        
-        time.sleep(check_interval)
+            return None
+    
+    # 每轮最多等待10秒，登录状态一出现即返回；轮与轮之间打印进度
+    while time.time() - start_time < timeout:
+        chunk = min(10, timeout - (time.time() - start_time))
+        message = wait_for_condition(driver, logged_in, chunk, "login", poll=WAIT_CONFIG["login_poll"])
+        if message:
+            print(f"✅ {message}")
+            return True
+        print(f"⏳ 已等待 {int(time.time() - start_time)} 秒，继续检测中...")
     
     return False
 
+
+def _try_restore_session(driver, platform, home_url):
+    return restore_session(
+        driver, platform, home_url,
+        probe=lambda d: check_login_state(d, platform, strict=True) is not None
+    )
+
+
 def login_xiaohongshu(driver):
-    """小红书登录：扫码登录自动检测"""
+    """小红书登录：优先恢复已保存的会话，失效时扫码登录自动检测"""
     try:
+        if _try_restore_session(driver, "xiaohongshu", XHS_CONFIG["explore_url"]):
+            return True
+        
         print("\n" + "="*60)
         print("📱 小红书扫码登录流程（自动检测模式）")
         print("="*60)
@@ -134,7 +229,7 @@ def login_xiaohongshu(driver):
         driver.set_window_size(1280, 900)
         driver.get("https://www.xiaohongshu.com/explore")
         print("→ 正在加载小红书页面...")
-        time.sleep(5)
+        wait_for_document_ready(driver)
         
         try:
             login_btn = WebDriverWait(driver, 15).until(
@@ -142,27 +237,31 @@ def login_xiaohongshu(driver):
             )
             driver.execute_script("arguments[0].click();", login_btn)
             print("→ 已自动点击登录按钮")
-            time.sleep(3)
+            wait_for_network_idle(driver)
         except:
             print("→ 未找到登录按钮，尝试直接访问登录页...")
             driver.get("https://www.xiaohongshu.com/")
-            time.sleep(5)
+            wait_for_document_ready(driver)
         
         try:
             qr_tab = driver.find_element(By.XPATH, "//*[contains(text(), '扫码登录') or contains(text(), '二维码') or contains(text(), 'APP扫码')]")
             driver.execute_script("arguments[0].click();", qr_tab)
             print("→ 已切换到扫码登录")
-            time.sleep(2)
+            wait_for_network_idle(driver)
         except:
             print("→ 扫码登录页面已就绪")
         
         driver.execute_script("document.body.style.zoom='90%'")
         driver.execute_script("window.scrollTo(0, 0);")
         
+        if is_headless(driver):
+            save_login_qr(driver, "./code/xhs_login_qr.png")
+            print("→ 无头模式：二维码已保存到 xhs_login_qr.png，请打开该图片扫码")
         print("\n📱 请使用小红书APP扫描屏幕上的二维码...")
         print("="*60)
         
         if wait_for_login_success(driver, "xiaohongshu", timeout=180):
+            save_session(driver, "xiaohongshu")
             print("✅ 小红书登录成功！即将开始爬取")
             print("="*60 + "\n")
             return True
@@ -179,8 +278,11 @@ def login_xiaohongshu(driver):
         return False
 
 def login_weibo(driver):
-    """微博登录：扫码登录自动检测"""
+    """微博登录：优先恢复已保存的会话，失效时扫码登录自动检测"""
     try:
+        if _try_restore_session(driver, "weibo", WEIBO_CONFIG["home_url"]):
+            return True
+        
         print("\n" + "="*60)
         print("📱 微博扫码登录流程（自动检测模式）")
         print("="*60)
@@ -192,13 +294,13 @@ def login_weibo(driver):
         driver.set_window_size(1280, 900)
         driver.get("https://passport.weibo.com/sso/signin?entry=miniblog")
         print("→ 正在加载微博登录页面...")
-        time.sleep(5)
+        wait_for_document_ready(driver)
         
         try:
             qr_tab = driver.find_element(By.XPATH, "//*[contains(text(), '扫码登录') or contains(@class, 'qr')]")
             driver.execute_script("arguments[0].click();", qr_tab)
             print("→ 已切换到扫码登录")
-            time.sleep(2)
+            wait_for_network_idle(driver)
         except:
             print("→ 扫码登录页面已就绪")
         
@@ -212,10 +314,14 @@ def login_weibo(driver):
         except:
             print("→ 二维码应已在可视区域")
         
+        if is_headless(driver):
+            save_login_qr(driver, "./code/weibo_login_qr.png")
+            print("→ 无头模式：二维码已保存到 weibo_login_qr.png，请打开该图片扫码")
         print("\n📱 请使用微博APP扫描屏幕上的二维码...")
         print("="*60)
         
         if wait_for_login_success(driver, "weibo", timeout=180):
+            save_session(driver, "weibo")
             print("✅ 微博登录成功！即将开始爬取")
             print("="*60 + "\n")
             return True
@@ -3,20 +3,27 @@
 流程：爬取内容 → 情绪分析 → 符合条件才存储
 """
 
-from login_utils import create_chrome_driver, login_xiaohongshu, login_weibo
-from crawler_utils import crawl_xiaohongshu, crawl_weibo
+from login_utils import is_headless, login_xiaohongshu, login_weibo
+from crawler_utils import crawl_sharded
+from driver_pool import DriverPool
 from config import CRAWL_CONFIG, EMOTION_CONFIG
+from text_cache import get_text_cache
+from text_prefilter import get_prefilter
+from deepseek_client import peek_deepseek_client
+from storage import close_writers
+from page_waits import print_wait_summary
 import argparse
 import time
 
 
-def main(target_texts=None, target_images=None, platforms=None):
+def main(target_texts=None, target_images=None, platforms=None, resume=False, profile=None, browsers=None, mode=None):
     """
     主程序入口
     """
     target_texts = target_texts or CRAWL_CONFIG["target_texts"]
     target_images = target_images or CRAWL_CONFIG["target_images"]
     platforms = platforms or ["weibo"]
+    mode = mode or CRAWL_CONFIG["mode"]
     
     print("=" * 60)
     print("🚀 社交媒体爬虫 + 情绪筛选系统")
@@ -24,15 +31,20 @@ def main(target_texts=None, target_images=None, platforms=None):
     print(f"目标文本：{target_texts} 条（带情绪标签）")
     print(f"目标图片：{target_images} 张（待本地分析）")
     print(f"目标平台：{', '.join(platforms)}")
+    print(f"采集方式：{'JSON接口' if mode == 'api' else '页面解析'}")
     print(f"筛选情绪：{', '.join(EMOTION_CONFIG['target_emotions'])}")
     print(f"最低分数：{EMOTION_CONFIG['min_score']}")
+    if browsers and browsers > 1:
+        print(f"并行浏览器：{browsers} 个")
+    if resume:
+        print("断点续爬：是")
     print("=" * 60)
     
-    driver = create_chrome_driver()
-    driver.implicitly_wait(10)
-    print("✅ 浏览器启动成功")
+    pool = DriverPool(browsers, profile, capture_network=mode == "api")
+    pool.start()
+    print(f"✅ 浏览器启动成功（{len(pool)} 个）")
     
-    total_stats = {"total_checked": 0, "texts_saved": 0, "images_downloaded": 0}
+    total_stats = {"total_checked": 0, "texts_saved": 0, "images_downloaded": 0, "near_duplicates": 0, "already_seen": 0}
     
     try:
         if "xiaohongshu" in platforms:
@@ -40,8 +52,9 @@ def main(target_texts=None, target_images=None, platforms=None):
             print("📱 小红书流程")
             print("=" * 60)
             
-            if login_xiaohongshu(driver):
-                stats = crawl_xiaohongshu(driver, target_texts, target_images)
+            drivers = pool.login(login_xiaohongshu)
+            if drivers:
+                stats = crawl_sharded("xiaohongshu", drivers, target_texts, target_images, resume=resume, mode=mode)
                 for k, v in stats.items():
                     total_stats[k] += v
             else:
@@ -53,11 +66,11 @@ def main(target_texts=None, target_images=None, platforms=None):
             print("=" * 60)
             
             if len(platforms) > 1:
-                driver.execute_script("window.open('');")
-                driver.switch_to.window(driver.window_handles[-1])
+                pool.open_new_tabs()
             
-            if login_weibo(driver):
-                stats = crawl_weibo(driver, target_texts, target_images)
+            drivers = pool.login(login_weibo)
+            if drivers:
+                stats = crawl_sharded("weibo", drivers, target_texts, target_images, resume=resume, mode=mode)
                 for k, v in stats.items():
                     total_stats[k] += v
             else:
@@ -67,11 +80,35 @@ def main(target_texts=None, target_images=None, platforms=None):
         print("📊 最终统计")
         print("=" * 60)
         print(f"检查总数：{total_stats['total_checked']} 条")
+        print(f"往次已处理：{total_stats['already_seen']} 条（已跳过）")
+        print(f"近重复跳过：{total_stats['near_duplicates']} 条")
         print(f"保存文本：{total_stats['texts_saved']} 条（已完成情绪分析）")
         print(f"下载图片：{total_stats['images_downloaded']} 张（待本地分析）")
+        cache = get_text_cache()
+        if cache is not None:
+            cache_stats = cache.stats()
+            print(f"文本缓存：命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}"
+                  f"（命中率 {cache_stats['hit_rate']:.0%}，共 {cache_stats['entries']} 条）")
+        prefilter = get_prefilter()
+        if prefilter is not None:
+            prefilter_stats = prefilter.stats()
+            line = f"本地预筛：跳过 {prefilter_stats['skipped']} 条 / 送远端 {prefilter_stats['passed']} 条"
+            if prefilter_stats["audited"]:
+                line += f"（抽检 {prefilter_stats['audited']} 条，与远端一致 {prefilter_stats['audit_precision']:.0%}）"
+            print(line)
+        client = peek_deepseek_client()
+        if client is not None:
+            client_stats = client.stats()
+            print(f"DeepSeek请求：成功 {client_stats['succeeded']} / 重试 {client_stats['retried']}"
+                  f" / 失败 {client_stats['failed']}（429 {client_stats['throttled']} 次，"
+                  f"5xx {client_stats['server_errors']} 次，异常响应 {client_stats['bad_responses']} 次，共 {client_stats['tokens']} tokens）")
+            print(f"DeepSeek限流：并发上限 {client_stats['concurrency_limit']}"
+                  f"（下调 {client_stats['concurrency_decreases']} 次），"
+                  f"限流等待 {client_stats['limiter_wait_seconds']} 秒")
+        print_wait_summary()
         print("=" * 60)
         print("数据位置：")
-        print("  - 筛选文本：./data/texts/<平台>/filtered_*.json")
+        print("  - 筛选文本：./data/texts/<平台>/filtered_*.jsonl")
         print("  - 待分析图片：./data/images/<平台>/pending/")
         print("=" * 60)
         
@@ -84,8 +121,10 @@ def main(target_texts=None, target_images=None, platforms=None):
         import traceback
         traceback.print_exc()
     finally:
-        input("\n按回车键关闭浏览器...")
-        driver.quit()
+        close_writers()
+        if not is_headless(pool.drivers[0]):
+            input("\n按回车键关闭浏览器...")
+        pool.quit()
 
 
 if __name__ == "__main__":
@@ -94,6 +133,13 @@ if __name__ == "__main__":
     parser.add_argument("--images", type=int, default=None, help="目标图片数量")
     parser.add_argument("--weibo-only", action="store_true", help="只爬取微博")
     parser.add_argument("--xhs-only", action="store_true", help="只爬取小红书")
+    parser.add_argument("--resume", action="store_true", help="从上次中断的断点继续")
+    parser.add_argument("--profile", choices=["interactive", "crawl"], default=None,
+                        help="浏览器模式：interactive 有界面 / crawl 无头精简（默认取 BROWSER_PROFILE）")
+    parser.add_argument("--mode", choices=["dom", "api"], default=None,
+                        help="采集方式：dom 解析页面 / api 直接取JSON接口（默认取 CRAWL_MODE）")
+    parser.add_argument("--browsers", type=int, default=None,
+                        help="并行浏览器数量（默认取 BROWSER_POOL_SIZE）")
     
     args = parser.parse_args()
     
@@ -106,5 +152,9 @@ if __name__ == "__main__":
     main(
         target_texts=args.texts,
         target_images=args.images,
-        platforms=platforms
+        platforms=platforms,
+        resume=args.resume,
+        profile=args.profile,
+        browsers=args.browsers,
+        mode=args.mode
     )
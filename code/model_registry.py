@@ -0,0 +1,91 @@
+"""
+进程级模型注册表
+- Haar级联分类器与FER检测器在首次使用时加载，之后整个进程共享
+- warm_up() 可在启动时预加载，避免首张图片承担加载耗时
+- release() 释放模型（例如长时间运行的进程在图片阶段结束后回收内存）
+注意：依赖 opencv / fer，在函数内部导入，未安装时抛出 ImportError
+"""
+
+import threading
+
+
+_models = {}
+_lock = threading.RLock()
+
+
+def _get_or_load(name, factory):
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _lock:
+        model = _models.get(name)
+        if model is None:
+            model = factory()
+            _models[name] = model
+        return model
+
+
+def _load_cascade(filename):
+    import cv2
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + filename)
+    if cascade.empty():
+        raise RuntimeError(f"无法加载级联分类器: {filename}")
+    return cascade
+
+
+def get_face_cascade():
+    """人脸Haar级联分类器"""
+    return _get_or_load("face_cascade", lambda: _load_cascade("haarcascade_frontalface_default.xml"))
+
+
+def get_body_cascade():
+    """人体Haar级联分类器"""
+    return _get_or_load("body_cascade", lambda: _load_cascade("haarcascade_fullbody.xml"))
+
+
+def get_cascades():
+    """返回 (人脸分类器, 人体分类器)"""
+    return get_face_cascade(), get_body_cascade()
+
+
+def get_fer_detector(mtcnn=True):
+    """FER情绪检测器（加载TensorFlow权重，耗时较长）"""
+    def factory():
+        from fer import FER
+        return FER(mtcnn=mtcnn)
+
+    return _get_or_load(f"fer_mtcnn={mtcnn}", factory)
+
+
+def warm_up(fer=True, mtcnn=True):
+    """预加载模型，返回已加载的模型名称列表"""
+    get_cascades()
+    if fer:
+        get_fer_detector(mtcnn=mtcnn)
+    return loaded_models()
+
+
+def loaded_models():
+    with _lock:
+        return sorted(_models)
+
+
+def release(name=None):
+    """
+    释放模型引用；name为None时释放全部
+    释放FER后同时清理Keras会话，归还TensorFlow占用的内存
+    """
+    with _lock:
+        names = [name] if name else list(_models)
+        released_fer = False
+        for key in names:
+            if _models.pop(key, None) is not None and key.startswith("fer"):
+                released_fer = True
+
+    if released_fer:
+        try:
+            from tensorflow.keras import backend
+            backend.clear_session()
+        except ImportError:
+            pass
@@ -0,0 +1,203 @@
+"""
+近重复文本索引（SimHash，SQLite持久化）
+- 指纹：规范化文本的字符n-gram加权SimHash（64位）
+- 检索：64位切分为 max_distance+1 段，由抽屉原理，汉明距离不超过阈值的
+  两个指纹至少有一段完全相同；按段建内存倒排，只对候选计算汉明距离
+- 检查与收录分开：文本成功分析后才收录，指纹写入SQLite跨运行持久化，启动时载入内存
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from config import NEAR_DUP_CONFIG
+
+FINGERPRINT_BITS = 64
+_MASK = (1 << FINGERPRINT_BITS) - 1
+
+
+def _canonical(text):
+    """去掉链接、空白与标点，只保留文字和数字"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = re.sub(r"https?://\S+", "", text)
+    return re.sub(r"[\W_]+", "", text)
+
+
+def _shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text, shingle_size=3):
+    """计算文本的64位SimHash；规范化后为空时返回None"""
+    text = _canonical(text)
+    if not text:
+        return None
+    if len(text) <= shingle_size:
+        shingles = Counter([text])
+    else:
+        shingles = Counter(text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1))
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle, count in shingles.items():
+        h = _shingle_hash(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += count if (h >> bit) & 1 else -count
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _to_signed(value):
+    """SQLite INTEGER 为有符号64位"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value):
+    return value & _MASK
+
+
+class NearDuplicateIndex:
+    """线程安全的SimHash近重复索引"""
+
+    def __init__(self, path, max_distance=3, shingle_size=3):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.checked = 0
+        self.duplicates = 0
+        self._lock = threading.Lock()
+
+        band_count = max_distance + 1
+        width = FINGERPRINT_BITS // band_count
+        self._bands = [
+            (i * width, FINGERPRINT_BITS - i * width if i == band_count - 1 else width)
+            for i in range(band_count)
+        ]
+        self._buckets = [defaultdict(list) for _ in self._bands]
+        self._fingerprints = set()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS simhash (
+                fingerprint INTEGER NOT NULL,
+                platform TEXT,
+                content_id TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        for (fingerprint,) in self._conn.execute("SELECT fingerprint FROM simhash"):
+            self._insert_memory(_to_unsigned(fingerprint))
+
+    def _band_values(self, fingerprint):
+        return [(fingerprint >> shift) & ((1 << width) - 1) for shift, width in self._bands]
+
+    def _insert_memory(self, fingerprint):
+        if fingerprint in self._fingerprints:
+            return
+        self._fingerprints.add(fingerprint)
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            bucket[value].append(fingerprint)
+
+    def _find_locked(self, fingerprint):
+        if fingerprint in self._fingerprints:
+            return fingerprint
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            for candidate in bucket.get(value, ()):
+                if hamming_distance(fingerprint, candidate) <= self.max_distance:
+                    return candidate
+        return None
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def check(self, text):
+        """
+        检查文本是否与已收录文本近重复（不收录）
+        :return: True 表示近重复（应跳过）
+        """
+        fingerprint = simhash(text, self.shingle_size)
+        if fingerprint is None:
+            return False
+
+        with self._lock:
+            self.checked += 1
+            if self._find_locked(fingerprint) is not None:
+                self.duplicates += 1
+                return True
+        return False
+
+    def add(self, text, platform=None, content_id=None):
+        """收录文本；应在文本成功分析之后调用，分析失败的文本不影响之后的近似文本"""
+        fingerprint = simhash(text, self.shingle_size)
+        if fingerprint is None:
+            return
+
+        with self._lock:
+            if fingerprint in self._fingerprints:
+                return
+            self._insert_memory(fingerprint)
+            self._conn.execute(
+                "INSERT INTO simhash (fingerprint, platform, content_id, created_at) VALUES (?, ?, ?, ?)",
+                (_to_signed(fingerprint), platform, content_id, time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return {"checked": self.checked, "duplicates": self.duplicates, "entries": len(self._fingerprints)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index = None
+_index_failed = False
+_index_lock = threading.Lock()
+
+
+def get_near_dup_index():
+    """获取进程内共享的近重复索引；未启用或打开失败时返回None"""
+    global _index, _index_failed
+    if not NEAR_DUP_CONFIG["enabled"] or _index_failed:
+        return None
+    with _index_lock:
+        if _index is None and not _index_failed:
+            try:
+                _index = NearDuplicateIndex(
+                    NEAR_DUP_CONFIG["path"],
+                    max_distance=NEAR_DUP_CONFIG["max_distance"],
+                    shingle_size=NEAR_DUP_CONFIG["shingle_size"],
+                )
+            except sqlite3.Error as e:
+                print(f"⚠️ 近重复索引不可用: {str(e)[:50]}")
+                _index_failed = True
+        return _index
+
+
+def is_near_duplicate(text):
+    """索引不可用时一律视为非重复"""
+    index = get_near_dup_index()
+    return index is not None and index.check(text)
+
+
+def remember_text(text, platform=None, content_id=None):
+    """把已成功分析的文本收录进近重复索引"""
+    index = get_near_dup_index()
+    if index is not None:
+        index.add(text, platform, content_id)
@@ -0,0 +1,276 @@
+"""
+基于条件的页面等待（替代固定 time.sleep）
+- 新卡片出现：页面内 MutationObserver 监听，数量增加（或复用的卡片节点换了链接）即返回
+- 网络空闲：开启 performance 日志的驱动按 CDP 网络事件（requestWillBeSent / loadingFinished / loadingFailed）
+  统计在途请求；其余驱动按页面资源加载记录判断。不改写页面的 fetch/XHR，页面脚本无法察觉
+- 弹窗打开/关闭：等待笔记详情元素出现/消失
+每种等待都有超时上限，并记录实际耗时，运行结束时可打印汇总
+条件等待期间关闭隐式等待，否则"元素消失/缺失"类条件每次检查都要等满隐式等待时间
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from config import WAIT_CONFIG
+
+_NEW_ELEMENTS_JS = """
+    var selector = arguments[0], minCount = arguments[1], timeoutMs = arguments[2];
+    var done = arguments[arguments.length - 1];
+    function count() { return document.querySelectorAll(selector).length; }
+    if (count() > minCount) { done(count()); return; }
+    var timer;
+    var observer = new MutationObserver(function() {
+        var n = count();
+        if (n > minCount) { observer.disconnect(); clearTimeout(timer); done(n); }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true});
+    timer = setTimeout(function() { observer.disconnect(); done(count()); }, timeoutMs);
+"""
+
+_CHANGED_CARDS_JS = """
+    var selector = arguments[0], linkSelector = arguments[1], attr = arguments[2], timeoutMs = arguments[3];
+    var done = arguments[arguments.length - 1];
+    function changed() {
+        var cards = document.querySelectorAll(selector);
+        for (var i = 0; i < cards.length; i++) {
+            var link = cards[i].matches(linkSelector) ? cards[i] : cards[i].querySelector(linkSelector);
+            if (link && link.href && cards[i].getAttribute(attr) !== link.href) return true;
+        }
+        return false;
+    }
+    if (changed()) { done(true); return; }
+    var timer;
+    var observer = new MutationObserver(function() {
+        if (changed()) { observer.disconnect(); clearTimeout(timer); done(true); }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeFilter: ['href']});
+    timer = setTimeout(function() { observer.disconnect(); done(false); }, timeoutMs);
+"""
+
+_NETWORK_IDLE_JS = """
+    var idleMs = arguments[0], timeoutMs = arguments[1];
+    var done = arguments[arguments.length - 1];
+    var start = Date.now(), last = Date.now();
+    var seen = performance.getEntriesByType('resource').length;
+    (function check() {
+        var n = performance.getEntriesByType('resource').length;
+        if (n !== seen) { seen = n; last = Date.now(); }
+        if (Date.now() - last >= idleMs) { done(true); return; }
+        if (Date.now() - start >= timeoutMs) { done(false); return; }
+        setTimeout(check, 50);
+    })();
+"""
+
+
+class WaitStats:
+    """各类等待的次数、总耗时与超时次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, elapsed, timed_out=False):
+        with self._lock:
+            entry = self._stats.setdefault(name, {"count": 0, "seconds": 0.0, "timeouts": 0})
+            entry["count"] += 1
+            entry["seconds"] += elapsed
+            entry["timeouts"] += int(timed_out)
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {**entry, "avg": entry["seconds"] / entry["count"]}
+                for name, entry in sorted(self._stats.items())
+            }
+
+
+wait_stats = WaitStats()
+
+
+class NetworkMonitor:
+    """
+    读取驱动 performance 日志中的 CDP 网络事件，统计在途请求
+    日志读出后即从驱动中清除，同一驱动的其他读取方（如接口采集的 NetworkCapture）通过 subscribe 接收事件
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._in_flight = set()
+        self._listeners = []
+        self.last_activity = time.monotonic()
+
+    def subscribe(self, callback):
+        """callback(method, params) 在每次 poll 读到网络事件时调用"""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def poll(self):
+        """读取新的网络事件，返回当前在途请求数"""
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method", "")
+            if not method.startswith("Network."):
+                continue
+            params = message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                self._in_flight.add(params.get("requestId"))
+                self.last_activity = time.monotonic()
+            elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                self._in_flight.discard(params.get("requestId"))
+                self.last_activity = time.monotonic()
+            for callback in list(self._listeners):
+                callback(method, params)
+        return len(self._in_flight)
+
+
+def network_monitor(driver):
+    """驱动以 capture_network=True 创建时返回其 NetworkMonitor（每个驱动一个），否则返回None"""
+    if not getattr(driver, "capture_network", False):
+        return None
+    monitor = getattr(driver, "network_monitor", None)
+    if monitor is None:
+        monitor = driver.network_monitor = NetworkMonitor(driver)
+    return monitor
+
+
+def _run_async(driver, script, timeout, *args):
+    """execute_async_script 的超时需覆盖脚本内部的超时"""
+    driver.set_script_timeout(timeout + 5)
+    return driver.execute_async_script(script, *args)
+
+
+def wait_for_document_ready(driver, timeout=None):
+    timeout = timeout or WAIT_CONFIG["page_load_timeout"]
+    start = time.monotonic()
+    timed_out = False
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+    except TimeoutException:
+        timed_out = True
+    wait_stats.record("document_ready", time.monotonic() - start, timed_out)
+    return not timed_out
+
+
+def count_elements(driver, selector):
+    return driver.execute_script("return document.querySelectorAll(arguments[0]).length;", selector)
+
+
+def wait_for_new_elements(driver, selector, min_count=0, timeout=None, name="new_elements"):
+    """
+    等待匹配 CSS selector 的元素数量超过 min_count
+    :return: 当前元素数量（超时时为超时时刻的数量）
+    """
+    timeout = timeout or WAIT_CONFIG["new_cards_timeout"]
+    start = time.monotonic()
+    try:
+        count = _run_async(driver, _NEW_ELEMENTS_JS, timeout, selector, min_count, int(timeout * 1000))
+    except TimeoutException:
+        count = min_count
+    wait_stats.record(name, time.monotonic() - start, count <= min_count)
+    return count
+
+
+def _wait_for_cdp_idle(monitor, idle_ms, timeout):
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        in_flight = monitor.poll()
+        now = time.monotonic()
+        if not in_flight and now - max(start, monitor.last_activity) >= idle_ms / 1000:
+            return True
+        if now >= deadline:
+            return False
+        time.sleep(0.05)
+
+
+def wait_for_changed_cards(driver, selector, link_selector, attr, timeout=None, name="changed_cards"):
+    """
+    等待出现链接与 attr 属性中记录的链接不同的卡片（新卡片，或虚拟列表复用节点后换了内容）
+    :return: 是否出现
+    """
+    timeout = timeout or WAIT_CONFIG["new_cards_timeout"]
+    start = time.monotonic()
+    try:
+        changed = _run_async(driver, _CHANGED_CARDS_JS, timeout, selector, link_selector, attr, int(timeout * 1000))
+    except TimeoutException:
+        changed = False
+    wait_stats.record(name, time.monotonic() - start, not changed)
+    return changed
+
+
+def wait_for_network_idle(driver, idle_ms=None, timeout=None):
+    """
+    等待网络空闲：idle_ms 内没有请求开始或结束（CDP网络事件）且在途请求清零；
+    驱动未开启 performance 日志时，等待 idle_ms 内没有新的资源加载记录
+    """
+    idle_ms = idle_ms or WAIT_CONFIG["network_idle_ms"]
+    timeout = timeout or WAIT_CONFIG["network_idle_timeout"]
+    start = time.monotonic()
+    monitor = network_monitor(driver)
+    try:
+        if monitor is not None:
+            idle = _wait_for_cdp_idle(monitor, idle_ms, timeout)
+        else:
+            idle = _run_async(driver, _NETWORK_IDLE_JS, timeout, idle_ms, int(timeout * 1000))
+    except TimeoutException:
+        idle = False
+    wait_stats.record("network_idle", time.monotonic() - start, not idle)
+    return idle
+
+
+@contextmanager
+def no_implicit_wait(driver):
+    """临时关闭隐式等待（查找缺失的元素立即返回），结束后恢复原值"""
+    previous_wait = driver.timeouts.implicit_wait
+    driver.implicitly_wait(0)
+    try:
+        yield driver
+    finally:
+        driver.implicitly_wait(previous_wait)
+
+
+def wait_for_condition(driver, condition, timeout, name, poll=0.2):
+    """通用条件等待；condition(driver) 返回真值即结束，超时返回None"""
+    start = time.monotonic()
+    try:
+        with no_implicit_wait(driver):
+            result = WebDriverWait(driver, timeout, poll_frequency=poll).until(condition)
+    except TimeoutException:
+        result = None
+    wait_stats.record(name, time.monotonic() - start, result is None)
+    return result
+
+
+def wait_for_modal_open(driver, locators, timeout=None):
+    """等待笔记详情弹窗中任一定位器对应的元素出现，返回该元素"""
+    timeout = timeout or WAIT_CONFIG["modal_timeout"]
+    return wait_for_condition(driver, EC.any_of(*(EC.presence_of_element_located(loc) for loc in locators)),
+                              timeout, "modal_open", poll=0.1)
+
+
+def wait_for_modal_close(driver, locator, timeout=None):
+    """等待弹窗元素消失"""
+    timeout = timeout or WAIT_CONFIG["modal_timeout"]
+    return wait_for_condition(driver, EC.invisibility_of_element_located(locator),
+                              timeout, "modal_close", poll=0.1)
+
+
+def print_wait_summary():
+    summary = wait_stats.summary()
+    if not summary:
+        return
+    parts = [f"{name} {entry['count']}次/均{entry['avg']:.2f}秒" + (f"/超时{entry['timeouts']}" if entry["timeouts"] else "")
+             for name, entry in summary.items()]
+    print("页面等待：" + "，".join(parts))
@@ -0,0 +1,185 @@
+"""
+筛选结果导出为 Parquet（列式存储，按 平台/日期 分区）
+- 文本：data/texts/<平台>/filtered_*.json(l) → data/parquet/texts/platform=<平台>/date=<YYYY-MM-DD>/
+- 图片：data/images/<平台>/filtered/analysis_*.json → data/parquet/images/platform=<平台>/date=<YYYY-MM-DD>/
+扁平结构：每种情绪一列（emotion_happy、emotion_sad …）、主导情绪、最高分、ID与时间
+每个分区整体重写为一个文件，重复运行即完成小文件合并；默认 zstd 压缩，昵称等低基数文本列使用字典编码
+
+运行方式：python parquet_export.py [texts|images|all] [--platform weibo] [--compression zstd]
+查询示例：
+    import pyarrow.dataset as ds
+    ds.dataset("data/parquet/texts", partitioning="hive").to_table(filter=ds.field("date") >= "2025-12-01")
+需要安装：pip install pyarrow
+"""
+
+import argparse
+import glob
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    print("❌ 请先安装依赖：pip install pyarrow")
+    exit(1)
+
+from config import SAVE_CONFIG, EMOTION_CONFIG, PARQUET_CONFIG
+from storage import iter_records, read_records
+
+PLATFORMS = ["xiaohongshu", "weibo"]
+
+# 情绪列名统一用英文：文本结果以中文情绪为键，图片报告中的 all_emotions 也是中文键
+_EMOTION_COLUMNS = {cn: f"emotion_{en}" for cn, en in zip(EMOTION_CONFIG["emotions"], EMOTION_CONFIG["emotions_en"])}
+_EMOTION_FIELDS = [pa.field(column, pa.float32()) for column in _EMOTION_COLUMNS.values()]
+
+TEXT_SCHEMA = pa.schema([
+    pa.field("content_id", pa.string()),
+    pa.field("nick_name", pa.string()),
+    pa.field("content", pa.string()),
+    pa.field("crawl_time", pa.timestamp("s")),
+    pa.field("dominant", pa.string()),
+    pa.field("max_score", pa.float32()),
+    *_EMOTION_FIELDS,
+    pa.field("platform", pa.string()),
+    pa.field("date", pa.string()),
+])
+
+IMAGE_SCHEMA = pa.schema([
+    pa.field("filename", pa.string()),
+    pa.field("report", pa.string()),
+    pa.field("analyzed_at", pa.timestamp("s")),
+    pa.field("dominant", pa.string()),
+    pa.field("max_score", pa.float32()),
+    *_EMOTION_FIELDS,
+    pa.field("platform", pa.string()),
+    pa.field("date", pa.string()),
+])
+
+_REPORT_TIME_RE = re.compile(r"analysis_(\d{8}_\d{6})\.json$")
+_LEVELED_CODECS = {"zstd", "gzip", "brotli"}
+
+
+def _parse_time(value, fmt="%Y-%m-%d %H:%M:%S"):
+    try:
+        return datetime.strptime(value, fmt)
+    except (TypeError, ValueError):
+        return None
+
+
+def _emotion_columns(scores):
+    return {column: scores.get(cn) for cn, column in _EMOTION_COLUMNS.items()}
+
+
+def text_rows(platform):
+    """把某平台的筛选文本展开为扁平行"""
+    for record in iter_records(os.path.join(SAVE_CONFIG["text_path"], platform)):
+        emotion = record.get("emotion_analysis") or {}
+        crawl_time = _parse_time(record.get("crawl_time"))
+        yield {
+            "content_id": str(record.get("mid") or record.get("post_id") or ""),
+            "nick_name": record.get("nick_name"),
+            "content": record.get("content"),
+            "crawl_time": crawl_time,
+            "dominant": emotion.get("dominant"),
+            "max_score": emotion.get("max_score"),
+            **_emotion_columns(emotion.get("emotions") or {}),
+            "platform": platform,
+            "date": crawl_time.strftime("%Y-%m-%d") if crawl_time else "unknown",
+        }
+
+
+def image_rows(platform):
+    """把某平台的图片分析报告展开为扁平行，分析时间取自报告文件名"""
+    pattern = os.path.join(SAVE_CONFIG["image_path"], platform, "filtered", "analysis_*.json")
+    for path in sorted(glob.glob(pattern)):
+        match = _REPORT_TIME_RE.search(path)
+        analyzed_at = _parse_time(match.group(1), "%Y%m%d_%H%M%S") if match else None
+        for result in read_records(path):
+            yield {
+                "filename": result.get("filename"),
+                "report": os.path.basename(path),
+                "analyzed_at": analyzed_at,
+                "dominant": result.get("emotion"),
+                "max_score": result.get("score"),
+                **_emotion_columns(result.get("all_emotions") or {}),
+                "platform": platform,
+                "date": analyzed_at.strftime("%Y-%m-%d") if analyzed_at else "unknown",
+            }
+
+
+def write_partitions(rows, schema, root, sort_column):
+    """
+    按 platform/date 分区写入；涉及到的分区整体替换为一个文件（重复运行即合并小文件）
+    分区内按 sort_column 排序，按时间过滤时可跳过无关的行组
+    :return: {(平台, 日期): 行数}
+    """
+    columns = defaultdict(lambda: defaultdict(list))
+    for row in rows:
+        partition = columns[(row["platform"], row["date"])]
+        for name in schema.names:
+            partition[name].append(row.get(name))
+
+    dictionary = [name for name in PARQUET_CONFIG["dictionary_columns"] if name in schema.names]
+    compression = PARQUET_CONFIG["compression"]
+    level = PARQUET_CONFIG["compression_level"] if compression in _LEVELED_CODECS else None
+    written = {}
+    for key in sorted(columns):
+        table = pa.table(columns.pop(key), schema=schema).sort_by(sort_column)
+        pq.write_to_dataset(
+            table, root,
+            partition_cols=["platform", "date"],
+            existing_data_behavior="delete_matching",
+            basename_template="part-{i}.parquet",
+            compression=compression,
+            compression_level=level,
+            use_dictionary=dictionary or False,
+        )
+        written[key] = table.num_rows
+    return written
+
+
+# 数据类型 → (行生成函数, 表结构, 分区内排序列)
+DATASETS = {
+    "texts": (text_rows, TEXT_SCHEMA, "crawl_time"),
+    "images": (image_rows, IMAGE_SCHEMA, "analyzed_at"),
+}
+
+
+def export(kind, platforms=None):
+    """导出 texts 或 images，返回写入的分区统计"""
+    rows_fn, schema, sort_column = DATASETS[kind]
+    root = os.path.join(PARQUET_CONFIG["path"], kind)
+    written = {}
+    for platform in platforms or PLATFORMS:
+        written.update(write_partitions(rows_fn(platform), schema, root, sort_column))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="筛选结果导出为分区Parquet")
+    parser.add_argument("kind", nargs="?", choices=["texts", "images", "all"], default="all")
+    parser.add_argument("--platform", choices=PLATFORMS, help="只导出指定平台")
+    parser.add_argument("--compression", help=f"压缩算法（默认 {PARQUET_CONFIG['compression']}）")
+    parser.add_argument("--no-dictionary", action="store_true", help="关闭文本列字典编码")
+    args = parser.parse_args(argv)
+
+    if args.compression:
+        PARQUET_CONFIG["compression"] = args.compression
+    if args.no_dictionary:
+        PARQUET_CONFIG["dictionary_columns"] = []
+
+    kinds = list(DATASETS) if args.kind == "all" else [args.kind]
+    platforms = [args.platform] if args.platform else None
+    for kind in kinds:
+        written = export(kind, platforms)
+        for (platform, date), count in written.items():
+            print(f"✓ {kind} {platform}/{date}：{count} 行")
+        print(f"{kind}：{len(written)} 个分区，共 {sum(written.values())} 行 → "
+              f"{os.path.join(PARQUET_CONFIG['path'], kind)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+人脸/人体检测
+- 完整模式：在原图灰度上运行级联分类器（与原实现一致）
+- 快速模式：先缩小到 max_side 再检测，检测框按比例映射回原图；
+  只有人脸分类器没有结果时才运行人体分类器
+参数见 config.py 的 IMAGE_FILTER_CONFIG，快速模式默认关闭，
+开启前先用 bench_person_detection.py 在标注样本上评估
+"""
+
+import cv2
+import model_registry
+from config import IMAGE_FILTER_CONFIG
+
+
+FAST_DETECT = IMAGE_FILTER_CONFIG["fast_detect"]
+DETECT_MAX_SIDE = IMAGE_FILTER_CONFIG["detect_max_side"]
+DETECT_SCALE_FACTOR = IMAGE_FILTER_CONFIG["detect_scale_factor"]
+DETECT_MIN_NEIGHBORS = IMAGE_FILTER_CONFIG["detect_min_neighbors"]
+
+
+def to_gray(img):
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def _downscale(gray, max_side):
+    """缩小到最长边不超过max_side，返回 (图像, 缩放比例)"""
+    height, width = gray.shape[:2]
+    longest = max(height, width)
+    if not max_side or longest <= max_side:
+        return gray, 1.0
+    scale = max_side / longest
+    resized = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+
+def _map_boxes(boxes, scale):
+    if scale == 1.0:
+        return [tuple(int(v) for v in box) for box in boxes]
+    return [tuple(int(round(v / scale)) for v in box) for box in boxes]
+
+
+def detect_person(img, fast=None, max_side=None, scale_factor=None, min_neighbors=None):
+    """
+    检测图片中的人脸或人体
+    :param img: BGR 或灰度图像
+    :return: (person_type, boxes)，person_type 为 "face" / "body" / None，
+             boxes 为原图坐标下的 (x, y, w, h) 列表
+    """
+    fast = FAST_DETECT if fast is None else fast
+    scale_factor = scale_factor or DETECT_SCALE_FACTOR
+    min_neighbors = DETECT_MIN_NEIGHBORS if min_neighbors is None else min_neighbors
+
+    gray = to_gray(img)
+    scale = 1.0
+    if fast:
+        gray, scale = _downscale(gray, max_side or DETECT_MAX_SIDE)
+
+    faces = model_registry.get_face_cascade().detectMultiScale(gray, scale_factor, min_neighbors)
+    if len(faces) > 0:
+        return "face", _map_boxes(faces, scale)
+
+    bodies = model_registry.get_body_cascade().detectMultiScale(gray, scale_factor, min_neighbors)
+    if len(bodies) > 0:
+        return "body", _map_boxes(bodies, scale)
+
+    return None, []
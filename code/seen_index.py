@@ -0,0 +1,108 @@
+"""
+跨运行的已处理ID索引（SQLite）
+- 按命名空间区分平台与类型，如 "weibo"、"xiaohongshu"、"weibo/images"
+- 主键查询，启动时无需整表载入
+- 可选过期：超过 ttl_days 的记录视为未见过，下次运行会重新处理
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from config import SEEN_INDEX_CONFIG
+
+
+def image_namespace(platform):
+    return f"{platform}/images"
+
+
+class SeenIndex:
+    """线程安全的已处理ID索引"""
+
+    def __init__(self, path, ttl_days=0):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days and ttl_days > 0 else None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def contains(self, namespace, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seen_at FROM seen WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        if row is None:
+            return False
+        return not (self.ttl and time.time() - row[0] > self.ttl)
+
+    def add(self, namespace, key):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO seen (namespace, key, seen_at) VALUES (?, ?, ?)",
+                (namespace, key, time.time()),
+            )
+            self._conn.commit()
+
+    def purge_expired(self):
+        """删除过期记录，返回删除条数"""
+        if not self.ttl:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM seen WHERE seen_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def count(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM seen WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index = None
+_index_failed = False
+_index_lock = threading.Lock()
+
+
+def get_seen_index():
+    """获取进程内共享的索引；未启用或打开失败时返回None"""
+    global _index, _index_failed
+    if not SEEN_INDEX_CONFIG["enabled"] or _index_failed:
+        return None
+    with _index_lock:
+        if _index is None and not _index_failed:
+            try:
+                _index = SeenIndex(SEEN_INDEX_CONFIG["path"], ttl_days=SEEN_INDEX_CONFIG["ttl_days"])
+                _index.purge_expired()
+            except sqlite3.Error as e:
+                print(f"⚠️ 已处理ID索引不可用: {str(e)[:50]}")
+                _index_failed = True
+        return _index
+
+
+def has_seen(namespace, key):
+    index = get_seen_index()
+    return index is not None and index.contains(namespace, key)
+
+
+def mark_seen(namespace, key):
+    index = get_seen_index()
+    if index is not None:
+        index.add(namespace, key)
@@ -0,0 +1,163 @@
+"""
+登录会话持久化
+- 登录成功后保存全部 cookies（CDP Network.getAllCookies，含 passport 等跨域cookie）与首页 localStorage
+- 按平台加密保存到 ./data/sessions/<平台>.session（Fernet，需 pip install cryptography）
+- 启动时恢复会话并访问首页探测是否仍处于登录状态，失效时才走扫码流程
+密钥取环境变量 SESSION_SECRET；未设置时自动生成并保存在 SESSION_KEY_PATH（默认用户配置目录，权限600），
+密钥与会话文件不放在同一目录，拷走会话目录不会连同密钥一起泄露
+"""
+
+import json
+import os
+import time
+from config import SESSION_CONFIG, WAIT_CONFIG
+from page_waits import wait_for_condition
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = ValueError
+
+_warned = False
+
+
+def _available():
+    global _warned
+    if not SESSION_CONFIG["enabled"]:
+        return False
+    if Fernet is None:
+        if not _warned:
+            print("⚠️ 未安装 cryptography，登录会话不会保存（pip install cryptography）")
+            _warned = True
+        return False
+    return True
+
+
+def _load_key():
+    secret = SESSION_CONFIG["secret"]
+    if secret:
+        return secret.encode()
+    key_path = SESSION_CONFIG["key_path"]
+    session_dir = os.path.abspath(SESSION_CONFIG["path"])
+    if os.path.abspath(key_path).startswith(session_dir + os.sep):
+        print(f"⚠️ 会话密钥 {key_path} 位于会话目录内，建议改用 SESSION_SECRET 或把 SESSION_KEY_PATH 设到其他目录")
+    if os.path.exists(key_path):
+        with open(key_path, "rb") as f:
+            return f.read().strip()
+    os.makedirs(os.path.dirname(os.path.abspath(key_path)), mode=0o700, exist_ok=True)
+    key = Fernet.generate_key()
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _session_path(platform):
+    return os.path.join(SESSION_CONFIG["path"], f"{platform}.session")
+
+
+def save_session(driver, platform):
+    """保存当前浏览器的登录会话，返回是否成功"""
+    if not _available():
+        return False
+    try:
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+        local_storage = driver.execute_script(
+            "var items = {};"
+            "for (var i = 0; i < localStorage.length; i++) {"
+            "  var k = localStorage.key(i); items[k] = localStorage.getItem(k);"
+            "}"
+            "return items;"
+        ) or {}
+        payload = json.dumps({
+            "platform": platform,
+            "origin": driver.execute_script("return window.location.origin;"),
+            "cookies": cookies,
+            "local_storage": local_storage,
+            "saved_at": time.time(),
+        }, ensure_ascii=False).encode("utf-8")
+
+        os.makedirs(SESSION_CONFIG["path"], exist_ok=True)
+        path = _session_path(platform)
+        tmp_path = f"{path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(Fernet(_load_key()).encrypt(payload))
+        os.replace(tmp_path, path)
+        print(f"✅ 登录会话已保存（{len(cookies)} 个cookie）")
+        return True
+    except Exception as e:
+        print(f"⚠️ 登录会话保存失败：{str(e)[:50]}")
+        return False
+
+
+def load_session(platform):
+    """读取并解密会话；不存在、过期或无法解密时返回None"""
+    if not _available():
+        return None
+    path = _session_path(platform)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            token = f.read()
+        ttl = int(SESSION_CONFIG["max_age_days"] * 86400) or None
+        data = json.loads(Fernet(_load_key()).decrypt(token, ttl=ttl))
+    except (InvalidToken, ValueError, OSError) as e:
+        print(f"⚠️ 登录会话无法读取（已过期或密钥不匹配）：{str(e)[:50]}")
+        return None
+    return data if data.get("platform") == platform else None
+
+
+def _restorable_cookie(cookie, now):
+    """转换为 Network.setCookies 的参数；已过期的cookie返回None"""
+    expires = cookie.get("expires", -1)
+    if not cookie.get("session") and expires != -1 and expires < now:
+        return None
+    fields = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
+    restored = {k: cookie[k] for k in fields if k in cookie}
+    if not cookie.get("session") and expires != -1:
+        restored["expires"] = expires
+    return restored
+
+
+def restore_session(driver, platform, home_url, probe_url=None, probe=None, probe_timeout=10):
+    """
+    恢复已保存的会话并探测是否有效
+    :param home_url: 用于写回 localStorage 的首页
+    :param probe_url: 探测登录状态的页面，默认为首页
+    :param probe: probe(driver) 返回是否已登录
+    :return: True=会话有效，可跳过扫码
+    """
+    data = load_session(platform)
+    if not data:
+        return False
+
+    now = time.time()
+    cookies = [c for c in (_restorable_cookie(c, now) for c in data.get("cookies", [])) if c]
+    if not cookies:
+        return False
+
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        local_storage = data.get("local_storage") or {}
+        if local_storage:
+            driver.get(data.get("origin") or home_url)
+            driver.execute_script(
+                "var items = arguments[0];"
+                "for (var k in items) { localStorage.setItem(k, items[k]); }",
+                local_storage
+            )
+        driver.get(probe_url or home_url)
+
+        if wait_for_condition(driver, probe, probe_timeout, "session_probe", poll=WAIT_CONFIG["login_poll"]):
+            print(f"✅ 已恢复登录会话（{len(cookies)} 个cookie），跳过扫码")
+            return True
+    except Exception as e:
+        print(f"⚠️ 登录会话恢复失败：{str(e)[:50]}")
+        return False
+
+    print("→ 已保存的登录会话失效，改用扫码登录")
+    return False
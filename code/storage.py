@@ -0,0 +1,238 @@
+"""
+文本存储引擎（追加写JSONL）
+- 每条记录一行，缓冲写入，后台线程按间隔fsync（空闲时也会写盘），崩溃最多丢失最后一个间隔内的数据
+- 按日期和文件大小滚动：filtered_YYYYMMDD.jsonl, filtered_YYYYMMDD_1.jsonl, ...
+- 提供读取与格式转换，兼容旧的 .json 数组文件
+
+命令行：
+    python storage.py to-jsonl data/texts/weibo        # 旧.json转换为.jsonl
+    python storage.py to-json data/texts/weibo/filtered_20251203.jsonl
+"""
+
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+class JsonlWriter:
+    """按日期/大小滚动的JSONL追加写入器（线程安全）"""
+
+    def __init__(self, directory, prefix="filtered", fsync_interval=5.0, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.prefix = prefix
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._date = None
+        self._part = 0
+        self._size = 0
+        self._dirty = False
+        self._last_sync = time.monotonic()
+        self._closed = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        if fsync_interval > 0:
+            threading.Thread(target=self._sync_loop, daemon=True).start()
+
+    @property
+    def path(self):
+        return self._path
+
+    def _part_path(self, date, part):
+        suffix = f"_{part}" if part else ""
+        return os.path.join(self.directory, f"{self.prefix}_{date}{suffix}.jsonl")
+
+    def _open_locked(self, date, part=0):
+        self._close_locked()
+        while True:
+            path = self._part_path(date, part)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if not self.max_bytes or size < self.max_bytes:
+                break
+            part += 1
+        self._file = open(path, "a", encoding="utf-8", buffering=1024 * 1024)
+        self._path = path
+        self._date = date
+        self._part = part
+        self._size = size
+
+    def _close_locked(self):
+        if self._file is not None:
+            self._sync_locked()
+            self._file.close()
+            self._file = None
+
+    def _sync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self._last_sync = time.monotonic()
+
+    def _sync_loop(self):
+        """定时写盘：一批写入之后即使不再有新记录，数据也会在 fsync_interval 内落盘"""
+        while not self._closed.wait(self.fsync_interval):
+            with self._lock:
+                if self._file is not None and self._dirty:
+                    self._sync_locked()
+
+    def write(self, record):
+        """追加一条记录"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            today = datetime.now().strftime("%Y%m%d")
+            if self._file is None or today != self._date:
+                self._open_locked(today)
+            elif self.max_bytes and self._size >= self.max_bytes:
+                self._open_locked(today, self._part + 1)
+
+            self._file.write(line)
+            self._size += len(line.encode("utf-8"))
+            self._dirty = True
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync_locked()
+
+    def flush(self):
+        """立即写盘并fsync"""
+        with self._lock:
+            if self._file is not None:
+                self._sync_locked()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._close_locked()
+
+
+def iter_jsonl(path):
+    """逐行读取JSONL，跳过崩溃时残留的不完整行"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"⚠️ 跳过损坏的记录: {os.path.basename(path)} 第{line_no}行")
+
+
+def read_records(path):
+    """读取 .json（数组）或 .jsonl 文件，返回记录列表"""
+    if path.endswith(".jsonl"):
+        return list(iter_jsonl(path))
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def _file_sort_key(path):
+    """按 日期 → 分卷号 排序，同名的 .json 排在 .jsonl 之前"""
+    name = os.path.basename(path)
+    match = re.match(r"(.+?)_(\d{8})(?:_(\d+))?\.(jsonl?)$", name)
+    if not match:
+        return (name, 0, 0)
+    return (match.group(2), int(match.group(3) or 0), 0 if match.group(4) == "json" else 1)
+
+
+def list_data_files(directory, prefix="filtered"):
+    """列出目录下所有 .json / .jsonl 数据文件（按日期排序）"""
+    files = glob.glob(os.path.join(directory, f"{prefix}_*.json"))
+    files += glob.glob(os.path.join(directory, f"{prefix}_*.jsonl"))
+    return sorted(files, key=_file_sort_key)
+
+
+def _record_key(record):
+    return json.dumps(record, ensure_ascii=False, sort_keys=True)
+
+
+def iter_records(directory, prefix="filtered"):
+    """
+    按时间顺序遍历目录下所有记录，新旧格式混合也可读取
+    同名的 .json 与 .jsonl 同时存在时两者都读取；.json 中与 .jsonl 完全相同的记录
+    （to-json 导出的副本）只返回一次
+    """
+    for path in list_data_files(directory, prefix):
+        if path.endswith(".jsonl"):
+            yield from iter_jsonl(path)
+        elif os.path.exists(path + "l"):
+            exported = {_record_key(record) for record in iter_jsonl(path + "l")}
+            yield from (record for record in read_records(path) if _record_key(record) not in exported)
+        else:
+            yield from read_records(path)
+
+
+def convert_json_to_jsonl(path, remove_source=False):
+    """把 .json 数组文件转换为同名 .jsonl，返回新文件路径"""
+    target = os.path.splitext(path)[0] + ".jsonl"
+    records = read_records(path)
+    with open(target, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    if remove_source:
+        os.remove(path)
+    return target
+
+
+def export_jsonl_to_json(path):
+    """把 .jsonl 导出为 .json 数组（供仍读取旧格式的下游脚本使用）"""
+    target = os.path.splitext(path)[0] + ".json"
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(list(iter_jsonl(path)), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, target)
+    return target
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(directory, prefix="filtered", fsync_interval=5.0, max_bytes=64 * 1024 * 1024):
+    """获取目录对应的共享写入器"""
+    key = (os.path.abspath(directory), prefix)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = JsonlWriter(directory, prefix, fsync_interval, max_bytes)
+            _writers[key] = writer
+        return writer
+
+
+def close_writers():
+    """关闭所有写入器（程序退出前调用）"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+def main(argv):
+    if len(argv) != 2 or argv[0] not in ("to-jsonl", "to-json"):
+        print(__doc__)
+        return 1
+
+    command, target = argv
+    if command == "to-jsonl":
+        paths = [p for p in list_data_files(target) if p.endswith(".json")] if os.path.isdir(target) else [target]
+        for path in paths:
+            new_path = convert_json_to_jsonl(path, remove_source=True)
+            print(f"✓ {path} → {new_path}")
+    else:
+        paths = [p for p in list_data_files(target) if p.endswith(".jsonl")] if os.path.isdir(target) else [target]
+        for path in paths:
+            new_path = export_jsonl_to_json(path)
+            print(f"✓ {path} → {new_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,212 @@
+"""
+文本情绪结果缓存（SQLite）
+- 键：规范化文本 + 提示词版本 + 模型名 的SHA256
+- 支持TTL过期与按条数上限的LRU淘汰
+- 记录命中/未命中次数，供最终统计展示
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from config import CACHE_CONFIG
+
+
+def normalize_text(text):
+    """规范化文本：全半角统一、合并空白、截断到提示词实际使用的长度"""
+    text = unicodedata.normalize("NFKC", text or "")
+    text = re.sub(r"\s+", " ", text).strip()
+    return text[:500]
+
+
+def make_cache_key(text, version):
+    """生成缓存键，version 应包含提示词版本与模型名"""
+    raw = f"{version}\x00{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TextEmotionCache:
+    """线程安全的SQLite情绪结果缓存"""
+
+    def __init__(self, path, ttl_days=30, max_entries=200000):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days and ttl_days > 0 else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS text_emotion (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_text_emotion_accessed ON text_emotion(accessed_at)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(text_emotion)")}
+        if "text" not in columns:
+            # 保存规范化文本，供本地预筛模型训练使用
+            self._conn.execute("ALTER TABLE text_emotion ADD COLUMN text TEXT")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM text_emotion").fetchone()[0]
+
+    def get_many(self, keys):
+        """批量查询，返回 {key: result}，过期条目视为未命中并删除"""
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        expired = []
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, result, created_at FROM text_emotion WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, result, created_at in rows:
+                    if self.ttl and now - created_at > self.ttl:
+                        expired.append(key)
+                    else:
+                        found[key] = json.loads(result)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE text_emotion SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+            if expired:
+                self._conn.executemany("DELETE FROM text_emotion WHERE key = ?", [(k,) for k in expired])
+                self._count -= len(expired)
+            if found or expired:
+                self._conn.commit()
+
+            hit_count = sum(1 for key in keys if key in found)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items, texts=None):
+        """
+        批量写入 {key: result}，超出上限时淘汰最久未访问的条目
+        texts 可选 {key: 原文}，以规范化形式一并保存
+        """
+        if not items:
+            return
+        now = time.time()
+        texts = texts or {}
+        rows = [
+            (json.dumps(result, ensure_ascii=False), now, now,
+             normalize_text(texts[key]) if key in texts else None, key)
+            for key, result in items.items()
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO text_emotion (result, created_at, accessed_at, text, key) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            inserted = self._conn.total_changes - before
+            self._conn.executemany(
+                "UPDATE text_emotion SET result = ?, created_at = ?, accessed_at = ?, "
+                "text = COALESCE(?, text) WHERE key = ?",
+                rows,
+            )
+            self._count += inserted
+            self._evict_locked()
+            self._conn.commit()
+
+    def put(self, key, result):
+        self.put_many({key: result})
+
+    def _evict_locked(self):
+        if not self.max_entries or self._count <= self.max_entries:
+            return
+        excess = self._count - self.max_entries
+        self._conn.execute(
+            """DELETE FROM text_emotion WHERE key IN (
+                   SELECT key FROM text_emotion ORDER BY accessed_at ASC LIMIT ?
+               )""",
+            (excess,),
+        )
+        self._count -= excess
+        self.evicted += excess
+
+    def iter_labeled(self):
+        """遍历带原文的缓存条目，产出 (text, result)，用于训练本地预筛模型"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT text, result FROM text_emotion WHERE text IS NOT NULL ORDER BY created_at"
+            ).fetchall()
+        for text, result in rows:
+            yield text, json.loads(result)
+
+    def purge_expired(self):
+        """删除所有过期条目，返回删除条数"""
+        if not self.ttl:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM text_emotion WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+            self._count -= cursor.rowcount
+            return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": self._count,
+                "evicted": self.evicted,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_text_cache():
+    """获取进程内共享的缓存实例；未启用或打开失败时返回None"""
+    global _cache, _cache_failed
+    if not CACHE_CONFIG["text_cache_enabled"] or _cache_failed:
+        return None
+    with _cache_lock:
+        if _cache is None and not _cache_failed:
+            try:
+                _cache = TextEmotionCache(
+                    CACHE_CONFIG["text_cache_path"],
+                    ttl_days=CACHE_CONFIG["text_cache_ttl_days"],
+                    max_entries=CACHE_CONFIG["text_cache_max_entries"],
+                )
+                _cache.purge_expired()
+            except sqlite3.Error as e:
+                print(f"⚠️ 文本缓存不可用: {str(e)[:50]}")
+                _cache_failed = True
+        return _cache
@@ -0,0 +1,292 @@
+"""
+文本情绪引擎
+- 统一接口：score_batch(texts) 返回与texts等长的结果列表，
+  元素为 {"emotions", "dominant", "max_score", "should_save"}，失败为None
+- deepseek：远端API（批量提示词 + 逐条重试，经共享客户端限流）
+- lexicon：本地词典打分，无网络依赖
+- onnx：本地ONNX中文情绪模型（需要 onnxruntime 与 tokenizers）
+通过 TEXT_ENGINE 环境变量切换
+"""
+
+import json
+import math
+import re
+import threading
+from config import EMOTION_CONFIG, TEXT_ENGINE_CONFIG
+from deepseek_client import get_deepseek_client
+from text_prefilter import lexicon_scores
+
+# 修改提示词或解析规则时递增，使旧缓存自动失效
+TEXT_PROMPT_VERSION = "batch-v1"
+
+
+def build_text_result(emotion_scores):
+    """根据情绪评分构造统一的分析结果"""
+    dominant = max(emotion_scores, key=emotion_scores.get)
+    max_score = emotion_scores[dominant]
+    
+    target_emotions = EMOTION_CONFIG["target_emotions"]
+    min_score = EMOTION_CONFIG["min_score"]
+    
+    should_save = False
+    for emotion in target_emotions:
+        if emotion in emotion_scores and emotion_scores[emotion] >= min_score:
+            should_save = True
+            break
+    
+    return {
+        "emotions": emotion_scores,
+        "dominant": dominant,
+        "max_score": max_score,
+        "should_save": should_save
+    }
+
+
+def _normalize_scores(item):
+    """校验单条评分：必须包含全部情绪类别且为数值，否则返回None"""
+    if not isinstance(item, dict):
+        return None
+    
+    scores = {}
+    for emotion in EMOTION_CONFIG["emotions"]:
+        value = item.get(emotion)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        scores[emotion] = float(value)
+    return scores
+
+
+def _parse_batch_response(content, count):
+    """
+    解析批量评分结果，逐条容错
+    返回长度为count的列表，解析失败的位置为None
+    """
+    items = None
+    array_match = re.search(r'\[.*\]', content, re.S)
+    if array_match:
+        try:
+            items = json.loads(array_match.group())
+        except ValueError:
+            items = None
+    
+    if not isinstance(items, list):
+        # 整体不是合法数组时，逐个对象抢救
+        items = []
+        for obj in re.findall(r'\{[^{}]+\}', content):
+            try:
+                items.append(json.loads(obj))
+            except ValueError:
+                items.append(None)
+    
+    results = [None] * count
+    for pos, item in enumerate(items):
+        idx = item.get("id", pos) if isinstance(item, dict) else pos
+        if not isinstance(idx, int) or not 0 <= idx < count or results[idx] is not None:
+            continue
+        scores = _normalize_scores(item)
+        if scores is not None:
+            results[idx] = scores
+    return results
+
+
+def _request_emotion_batch(texts):
+    """
+    发送一次批量请求，返回与texts等长的评分列表（解析失败项为None）
+    限流、并发与429/5xx重试由共享客户端负责，重试耗尽时抛出 DeepSeekUnavailable
+    """
+    emotions = EMOTION_CONFIG["emotions"]
+    numbered = "\n".join(
+        f"[{i}] " + " ".join(text[:500].split()) for i, text in enumerate(texts)
+    )
+    example = ", ".join(f'"{e}": 0.0' for e in emotions)
+    prompt = f"""分析以下{len(texts)}条文本的情绪，为每条文本返回情绪评分（0-1之间）。
+情绪类别：{', '.join(emotions)}
+
+文本（方括号内为编号）：
+{numbered}
+
+请直接返回JSON数组，每条文本一个对象，id为文本编号，格式如下：
+[{{"id": 0, {example}}}]"""
+
+    content = get_deepseek_client().chat(prompt, max_tokens=120 * len(texts) + 50)
+    return _parse_batch_response(content, len(texts))
+
+
+class TextEmotionEngine:
+    """情绪引擎基类"""
+    
+    name = "base"
+    # 远端引擎的结果会写入缓存，并在调用前经过本地预筛
+    remote = False
+    
+    @property
+    def cache_version(self):
+        return self.name
+    
+    def score_batch(self, texts, batch_size=None):
+        raise NotImplementedError
+
+
+class DeepSeekEngine(TextEmotionEngine):
+    """DeepSeek远端引擎"""
+    
+    name = "deepseek"
+    remote = True
+    
+    @property
+    def cache_version(self):
+        return f"{TEXT_PROMPT_VERSION}:{EMOTION_CONFIG['deepseek_model']}"
+    
+    def score_batch(self, texts, batch_size=None):
+        results = [None] * len(texts)
+        api_key = EMOTION_CONFIG["deepseek_api_key"]
+        if not api_key:
+            print("⚠️ DeepSeek API未配置，跳过情绪分析")
+            return results
+        
+        batch_size = max(1, batch_size or EMOTION_CONFIG["batch_size"])
+        pending = list(range(len(texts)))
+        
+        for _ in range(EMOTION_CONFIG["batch_retries"] + 1):
+            failed = []
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                try:
+                    scores_list = _request_emotion_batch([texts[i] for i in chunk])
+                except Exception as e:
+                    print(f"文本情绪分析失败: {str(e)[:50]}")
+                    scores_list = [None] * len(chunk)
+                
+                for i, scores in zip(chunk, scores_list):
+                    if scores is None:
+                        failed.append(i)
+                    else:
+                        results[i] = build_text_result(scores)
+            
+            if not failed:
+                break
+            pending = failed
+        
+        return results
+
+
+class LexiconEngine(TextEmotionEngine):
+    """
+    词典引擎：按情绪关键词命中数打分
+    命中越多情绪强度越高，强度按命中比例分配给各情绪，其余归为中性
+    """
+    
+    name = "lexicon"
+    
+    def score_batch(self, texts, batch_size=None):
+        return [self._score(text) for text in texts]
+    
+    @staticmethod
+    def _score(text):
+        hits = lexicon_scores(text)
+        tone = hits.pop("语气")
+        total = sum(hits.values())
+        scores = {emotion: 0.0 for emotion in EMOTION_CONFIG["emotions"]}
+        if not total:
+            scores["中性"] = 1.0
+            return build_text_result(scores)
+        
+        intensity = 1.0 - math.exp(-0.7 * (total + 0.5 * tone))
+        for emotion, count in hits.items():
+            scores[emotion] = round(intensity * count / total, 2)
+        scores["中性"] = round(1.0 - intensity, 2)
+        return build_text_result(scores)
+
+
+class OnnxEngine(TextEmotionEngine):
+    """
+    ONNX本地模型引擎（如导出为ONNX的中文情绪分类模型）
+    模型输入 input_ids / attention_mask（可选 token_type_ids），输出每个标签的logits；
+    标签顺序由 TEXT_ONNX_LABELS 指定，不在情绪类别中的标签忽略
+    """
+    
+    name = "onnx"
+    
+    def __init__(self):
+        import numpy as np
+        import onnxruntime
+        from tokenizers import Tokenizer
+        
+        self._np = np
+        self.model_path = TEXT_ENGINE_CONFIG["onnx_model_path"]
+        self.session = onnxruntime.InferenceSession(
+            self.model_path, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {item.name for item in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(TEXT_ENGINE_CONFIG["onnx_tokenizer_path"])
+        self.max_length = TEXT_ENGINE_CONFIG["onnx_max_length"]
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        self.tokenizer.enable_padding()
+        self.labels = TEXT_ENGINE_CONFIG["onnx_labels"]
+    
+    @property
+    def cache_version(self):
+        return f"onnx:{self.model_path}"
+    
+    def score_batch(self, texts, batch_size=None):
+        np = self._np
+        batch_size = batch_size or TEXT_ENGINE_CONFIG["onnx_batch_size"]
+        results = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            }
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+            feeds = {k: v for k, v in feeds.items() if k in self.input_names}
+            
+            logits = self.session.run(None, feeds)[0]
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            
+            for row in probs:
+                scores = {emotion: 0.0 for emotion in EMOTION_CONFIG["emotions"]}
+                for label, prob in zip(self.labels, row):
+                    if label in scores:
+                        scores[label] = round(float(prob), 4)
+                results.append(build_text_result(scores))
+        return results
+
+
+ENGINES = {
+    "deepseek": DeepSeekEngine,
+    "lexicon": LexiconEngine,
+    "onnx": OnnxEngine,
+}
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_text_engine(name=None):
+    """
+    获取情绪引擎；name为None时使用配置中的引擎（进程内共享）
+    本地模型依赖缺失或加载失败时回退到词典引擎
+    """
+    global _engine
+    if name is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine(TEXT_ENGINE_CONFIG["engine"])
+            return _engine
+    return _create_engine(name)
+
+
+def _create_engine(engine_name):
+    engine_cls = ENGINES.get(engine_name)
+    if engine_cls is None:
+        raise ValueError(f"未知的文本情绪引擎: {engine_name}（可选：{', '.join(ENGINES)}）")
+    
+    try:
+        return engine_cls()
+    except (ImportError, OSError, RuntimeError, ValueError) as e:
+        print(f"⚠️ 文本情绪引擎 {engine_name} 不可用，改用词典引擎: {str(e)[:50]}")
+        return LexiconEngine()
@@ -0,0 +1,334 @@
+"""
+文本情绪本地预筛
+- 在调用DeepSeek之前运行，把"有把握是中性"的文本直接判为不保存，省去一次API调用
+- 词典打分：六类情绪关键词 + 微博表情 + 感叹语气
+- 朴素贝叶斯模型：用文本缓存中DeepSeek的历史标注训练（字二元组 + 词典特征）
+- 置信度阈值可配置；按比例抽检被跳过的文本，统计与远端标签的一致性
+
+命令行：
+    python text_prefilter.py train              # 用缓存历史训练并在留出集上评估
+    python text_prefilter.py eval --threshold 0.95
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+from collections import Counter
+from config import EMOTION_CONFIG, PREFILTER_CONFIG
+from text_cache import normalize_text
+
+
+EMOTION_LEXICON = {
+    "喜": ["开心", "高兴", "快乐", "幸福", "哈哈", "太好了", "喜欢", "爱了", "激动", "感动", "满意",
+          "兴奋", "欣慰", "庆祝", "恭喜", "棒", "赞", "甜", "美好", "期待", "笑死", "好耶",
+          "[哈哈]", "[笑cry]", "[爱你]", "[鼓掌]", "[太开心]", "[心]", "[赞]"],
+    "怒": ["生气", "愤怒", "气死", "恼火", "可恶", "混蛋", "凭什么", "无耻", "离谱", "过分",
+          "忍无可忍", "火大", "抗议", "谴责", "滚", "垃圾", "[怒]", "[怒骂]", "[抓狂]"],
+    "哀": ["难过", "伤心", "悲伤", "心疼", "哭", "泪目", "遗憾", "痛心", "绝望", "失望", "孤独",
+          "想念", "去世", "离世", "节哀", "崩溃", "心碎", "[泪]", "[悲伤]", "[伤心]", "[哭]"],
+    "惧": ["害怕", "恐惧", "担心", "担忧", "吓", "可怕", "恐怖", "焦虑", "不安", "慌", "危险",
+          "后怕", "瑟瑟发抖", "[害怕]", "[惊恐]"],
+    "惊": ["震惊", "惊讶", "没想到", "竟然", "居然", "天哪", "天啊", "卧槽", "不敢相信", "意外",
+          "万万没想到", "[吃惊]", "[惊讶]", "[允悲]"],
+    "厌": ["恶心", "讨厌", "厌恶", "反感", "烦死", "无语", "受够", "鄙视", "嫌弃", "吐了",
+          "[吐]", "[鄙视]", "[哼]", "[白眼]"],
+}
+
+_LEXICON_PATTERNS = {
+    emotion: re.compile("|".join(re.escape(word) for word in words))
+    for emotion, words in EMOTION_LEXICON.items()
+}
+_EXCLAIM = re.compile(r"[!！?？]{2,}|[!！]")
+
+
+def lexicon_scores(text):
+    """词典打分：返回 {情绪: 命中次数}，另含 "语气" 表示感叹/反问强度"""
+    scores = {emotion: len(pattern.findall(text)) for emotion, pattern in _LEXICON_PATTERNS.items()}
+    scores["语气"] = len(_EXCLAIM.findall(text))
+    return scores
+
+
+def extract_features(text):
+    """字二元组 + 词典命中特征"""
+    text = normalize_text(text)
+    features = Counter(text[i:i + 2] for i in range(len(text) - 1))
+    for emotion, count in lexicon_scores(text).items():
+        if count:
+            features[f"LEX:{emotion}"] += min(count, 3)
+    return features
+
+
+class NaiveBayesNeutralModel:
+    """
+    多项式朴素贝叶斯二分类：中性（不需保存）vs 含目标情绪
+    接口风格参照 scikit-learn：fit / predict_proba
+    """
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.class_counts = {True: 0, False: 0}
+        self.feature_counts = {True: Counter(), False: Counter()}
+        self.totals = {True: 0, False: 0}
+        self.vocab_size = 1
+
+    def fit(self, texts, labels):
+        """labels: True 表示中性"""
+        for text, label in zip(texts, labels):
+            features = extract_features(text)
+            self.class_counts[label] += 1
+            self.feature_counts[label].update(features)
+        self._refresh()
+        return self
+
+    def _refresh(self):
+        self.totals = {label: sum(counts.values()) for label, counts in self.feature_counts.items()}
+        vocab = set(self.feature_counts[True]) | set(self.feature_counts[False])
+        self.vocab_size = max(1, len(vocab))
+
+    def _log_likelihood(self, features, label):
+        n_docs = sum(self.class_counts.values())
+        prior = (self.class_counts[label] + 1) / (n_docs + 2)
+        counts = self.feature_counts[label]
+        denominator = self.totals[label] + self.alpha * self.vocab_size
+        score = math.log(prior)
+        for feature, count in features.items():
+            score += count * math.log((counts.get(feature, 0) + self.alpha) / denominator)
+        return score
+
+    def predict_proba(self, texts):
+        """返回每条文本为中性的概率"""
+        probs = []
+        for text in texts:
+            features = extract_features(text)
+            neutral = self._log_likelihood(features, True)
+            emotional = self._log_likelihood(features, False)
+            diff = max(-50.0, min(50.0, emotional - neutral))
+            probs.append(1.0 / (1.0 + math.exp(diff)))
+        return probs
+
+    @property
+    def trained(self):
+        return self.class_counts[True] > 0 and self.class_counts[False] > 0
+
+    def save(self, path, min_count=2):
+        """保存模型，丢弃出现次数少于min_count的特征以控制文件大小"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = {
+            "alpha": self.alpha,
+            "class_counts": {"neutral": self.class_counts[True], "emotional": self.class_counts[False]},
+            "features": {
+                name: {k: v for k, v in self.feature_counts[label].items() if v >= min_count}
+                for name, label in (("neutral", True), ("emotional", False))
+            },
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        model = cls(alpha=data["alpha"])
+        model.class_counts = {True: data["class_counts"]["neutral"], False: data["class_counts"]["emotional"]}
+        model.feature_counts = {
+            True: Counter(data["features"]["neutral"]),
+            False: Counter(data["features"]["emotional"]),
+        }
+        model._refresh()
+        return model
+
+
+def is_neutral_label(result):
+    """远端结果对应的标签：不满足保存条件即视为中性"""
+    return not result.get("should_save", False)
+
+
+class TextPrefilter:
+    """
+    预筛入口：decide(text) 判断是否可以跳过远端调用
+    有训练好的模型时用模型概率；否则仅用词典（无命中时置信度固定为 lexicon_confidence，
+    默认与 threshold 相同，即无情绪词、无感叹语气的文本直接判为中性）
+    """
+
+    def __init__(self, threshold=None, model=None, audit_rate=None, lexicon_confidence=None):
+        self.threshold = PREFILTER_CONFIG["threshold"] if threshold is None else threshold
+        self.audit_rate = PREFILTER_CONFIG["audit_rate"] if audit_rate is None else audit_rate
+        self.model = model
+        self.lexicon_confidence = (PREFILTER_CONFIG["lexicon_confidence"]
+                                   if lexicon_confidence is None else lexicon_confidence)
+        self.skipped = 0
+        self.passed = 0
+        # 抽检：被判为中性但仍送远端的文本与远端标签的对比
+        self.audit = {"agree": 0, "disagree": 0}
+        self._lock = threading.Lock()
+
+    def neutral_confidence(self, text):
+        lexicon = lexicon_scores(text)
+        if any(count for emotion, count in lexicon.items() if emotion != "语气"):
+            return 0.0
+        if self.model is not None and self.model.trained:
+            return self.model.predict_proba([text])[0]
+        return self.lexicon_confidence if not lexicon["语气"] else 0.0
+
+    def decide(self, text):
+        """
+        返回 (skip, audit, confidence)：skip 表示可跳过远端调用；
+        audit 表示本条虽判为中性，但需送远端核对
+        """
+        confidence = self.neutral_confidence(text)
+        confident = confidence >= self.threshold
+        audit = confident and random.random() < self.audit_rate
+        with self._lock:
+            if confident and not audit:
+                self.skipped += 1
+            else:
+                self.passed += 1
+        return confident and not audit, audit, confidence
+
+    def record_audit(self, remote_result):
+        """记录一条抽检结果"""
+        if remote_result is None:
+            return
+        with self._lock:
+            key = "agree" if is_neutral_label(remote_result) else "disagree"
+            self.audit[key] += 1
+
+    def stats(self):
+        with self._lock:
+            audited = self.audit["agree"] + self.audit["disagree"]
+            return {
+                "skipped": self.skipped,
+                "passed": self.passed,
+                "audited": audited,
+                "audit_precision": self.audit["agree"] / audited if audited else None,
+            }
+
+
+def neutral_result(confidence):
+    """预筛判为中性时返回的结果（与远端结果格式一致）"""
+    emotions = {emotion: 0.0 for emotion in EMOTION_CONFIG["emotions"]}
+    emotions["中性"] = round(confidence, 2)
+    return {
+        "emotions": emotions,
+        "dominant": "中性",
+        "max_score": emotions["中性"],
+        "should_save": False,
+        "source": "prefilter",
+    }
+
+
+_prefilter = None
+_prefilter_lock = threading.Lock()
+
+
+def get_prefilter():
+    """获取共享预筛实例；未启用时返回None"""
+    global _prefilter
+    if not PREFILTER_CONFIG["enabled"]:
+        return None
+    with _prefilter_lock:
+        if _prefilter is None:
+            model = None
+            model_path = PREFILTER_CONFIG["model_path"]
+            if os.path.exists(model_path):
+                try:
+                    model = NaiveBayesNeutralModel.load(model_path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️ 预筛模型加载失败，仅使用词典: {str(e)[:50]}")
+            _prefilter = TextPrefilter(model=model)
+            if model is None and _prefilter.lexicon_confidence < _prefilter.threshold:
+                print("⚠️ 无预筛模型且 TEXT_PREFILTER_LEXICON_CONFIDENCE 低于阈值，预筛不会跳过任何文本")
+        return _prefilter
+
+
+def evaluate(model, texts, labels, threshold, lexicon_confidence=None):
+    """
+    以远端标签为准评估"跳过"决策
+    precision：被跳过的文本中确实为中性的比例（越高越不会漏存）
+    recall：所有中性文本中被跳过的比例（越高越省API调用）
+    """
+    prefilter = TextPrefilter(threshold=threshold, model=model, audit_rate=0.0,
+                              lexicon_confidence=lexicon_confidence)
+    tp = fp = fn = 0
+    for text, label in zip(texts, labels):
+        skip = prefilter.neutral_confidence(text) >= threshold
+        if skip and label:
+            tp += 1
+        elif skip:
+            fp += 1
+        elif label:
+            fn += 1
+    return {
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "skip_rate": (tp + fp) / len(texts) if texts else 0.0,
+    }
+
+
+def _load_history():
+    from text_cache import get_text_cache
+
+    cache = get_text_cache()
+    if cache is None:
+        return [], []
+    texts, labels = [], []
+    for text, result in cache.iter_labeled():
+        if result.get("source") == "prefilter":
+            continue
+        texts.append(text)
+        labels.append(is_neutral_label(result))
+    return texts, labels
+
+
+def _print_report(name, metrics):
+    print(f"  {name}：精确率 {metrics['precision']:.2%} | 召回率 {metrics['recall']:.2%}"
+          f" | 跳过比例 {metrics['skip_rate']:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文本情绪本地预筛")
+    parser.add_argument("command", choices=["train", "eval"])
+    parser.add_argument("--threshold", type=float, default=PREFILTER_CONFIG["threshold"])
+    parser.add_argument("--holdout", type=float, default=0.2, help="train时留出评估的比例")
+    args = parser.parse_args()
+
+    texts, labels = _load_history()
+    if not texts:
+        print("⚠️ 文本缓存中没有带原文的历史标注，请先正常爬取一段时间")
+        return
+    neutral = sum(labels)
+    print(f"历史标注：{len(texts)} 条（中性 {neutral} / 含情绪 {len(texts) - neutral}）")
+
+    if args.command == "train":
+        order = list(range(len(texts)))
+        random.Random(42).shuffle(order)
+        split = int(len(order) * (1 - args.holdout))
+        train_idx, test_idx = order[:split], order[split:]
+        model = NaiveBayesNeutralModel().fit([texts[i] for i in train_idx], [labels[i] for i in train_idx])
+        if test_idx:
+            print(f"留出集评估（{len(test_idx)} 条，阈值 {args.threshold}）：")
+            test_texts = [texts[i] for i in test_idx]
+            test_labels = [labels[i] for i in test_idx]
+            _print_report("仅词典", evaluate(None, test_texts, test_labels, args.threshold))
+            _print_report("模型", evaluate(model, test_texts, test_labels, args.threshold))
+        model = NaiveBayesNeutralModel().fit(texts, labels)
+        model.save(PREFILTER_CONFIG["model_path"])
+        print(f"✅ 模型已用全部 {len(texts)} 条数据训练并保存: {PREFILTER_CONFIG['model_path']}")
+    else:
+        model = None
+        if os.path.exists(PREFILTER_CONFIG["model_path"]):
+            model = NaiveBayesNeutralModel.load(PREFILTER_CONFIG["model_path"])
+        print(f"全量评估（阈值 {args.threshold}，模型数据包含在训练集中，结果偏乐观）：")
+        _print_report("仅词典", evaluate(None, texts, labels, args.threshold))
+        if model is not None:
+            _print_report("模型", evaluate(model, texts, labels, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
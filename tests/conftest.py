@@ -0,0 +1,19 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "code"))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@pytest.fixture
+def load_fixture():
+    """读取 tests/fixtures 下录制的接口JSON"""
+    def load(name):
+        with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+            return json.load(f)
+    return load
@@ -0,0 +1,134 @@
+"""接口解析函数：用录制的微博/小红书接口JSON验证"""
+
+import json
+
+from api_harvest import consume_record, parse_weibo_timeline, parse_xhs_feed, parse_xhs_note, weibo_statuses
+from dom_extract import extract_xhs_feed_notes
+
+CRAWL_TIME = "2025-12-02 09:30:00"
+
+
+def test_weibo_timeline_skips_ads_and_keeps_order(load_fixture):
+    records = parse_weibo_timeline(load_fixture("weibo_hottimeline.json"), CRAWL_TIME)
+    assert [r["content_id"] for r in records] == ["5021473892811234", "5021473892815678", "5021473892820001"]
+
+
+def test_weibo_status_fields(load_fixture):
+    record = parse_weibo_timeline(load_fixture("weibo_hottimeline.json"), CRAWL_TIME)[0]
+    assert record["content"] == "今天终于考完试了，#期末# 开心到飞起"
+    assert record["text_data"] == {
+        "platform": "weibo",
+        "mid": "5021473892811234",
+        "nick_name": "小林同学",
+        "content": "今天终于考完试了，#期末# 开心到飞起",
+        "crawl_time": CRAWL_TIME,
+    }
+    # 有 pic_infos 的取最大图，没有的按 pid 拼大图地址
+    assert record["image_urls"] == [
+        "https://wx1.sinaimg.cn/orj1080/006aBcDegy1hx0a1b2c3dj30u0140.jpg",
+        "https://wx1.sinaimg.cn/large/006aBcDegy1hx0a1b2c3ej30u0140.jpg",
+    ]
+
+
+def test_weibo_status_without_text_raw_strips_html(load_fixture):
+    record = parse_weibo_timeline(load_fixture("weibo_hottimeline.json"), CRAWL_TIME)[-1]
+    assert record["content"] == "转发理由：太感人了"
+    assert record["image_urls"] == []
+
+
+def test_weibo_statuses_nested_under_data(load_fixture):
+    payload = load_fixture("weibo_timeline_data.json")
+    assert [s["mid"] for s in weibo_statuses(payload)] == ["5021480000000001"]
+    records = parse_weibo_timeline(payload, CRAWL_TIME)
+    assert len(records) == 1
+    assert records[0]["text_data"]["nick_name"] == "雨天"
+    assert records[0]["image_urls"] == ["https://wx1.sinaimg.cn/large/006xYzAbgy1hx0z9y8x7wj30u0140.jpg"]
+
+
+def test_weibo_empty_payload():
+    assert parse_weibo_timeline({"ok": 0}) == []
+    assert weibo_statuses({"ok": 1, "data": None}) == []
+
+
+def test_xhs_homefeed_skips_ads(load_fixture):
+    records = parse_xhs_feed(load_fixture("xhs_homefeed.json"), CRAWL_TIME)
+    assert [r["content_id"] for r in records] == ["6748a1b2000000000703c9e1", "6748a1b2000000000703c9e3"]
+
+
+def test_xhs_homefeed_note_uses_title_and_cover(load_fixture):
+    record = parse_xhs_feed(load_fixture("xhs_homefeed.json"), CRAWL_TIME)[0]
+    assert record["content"] == "冬天第一杯热可可☕️"
+    assert record["text_data"] == {
+        "platform": "xiaohongshu",
+        "post_id": "6748a1b2000000000703c9e1",
+        "content": "冬天第一杯热可可☕️",
+        "crawl_time": CRAWL_TIME,
+    }
+    assert record["image_urls"] == [
+        "https://sns-webpic-qc.xhscdn.com/202512020914/1a2b3c/1040g2sg31abcdef!nc_n_webp_mw_1"
+    ]
+
+
+def test_xhs_cover_falls_back_to_info_list(load_fixture):
+    record = parse_xhs_feed(load_fixture("xhs_homefeed.json"), CRAWL_TIME)[1]
+    assert record["content"] == ""
+    assert record["image_urls"] == [
+        "https://sns-webpic-qc.xhscdn.com/202512020914/4d5e6f/1040g2sg31fedcba!nc_n_webp_mw_1"
+    ]
+
+
+def test_xhs_initial_state_camel_case(load_fixture):
+    record = parse_xhs_note(load_fixture("xhs_initial_state_feeds.json")[0], CRAWL_TIME)
+    assert record["content_id"] == "6748b2c3000000000703d0f1"
+    assert record["content"] == "周末去海边\n风很大，但是心情很好，拍了好多照片"
+    assert record["image_urls"] == [
+        "https://sns-webpic-qc.xhscdn.com/202512020930/7a8b9c/1040g2sg31aaaa01!nd_dft_wlteh_webp_3",
+        "https://sns-webpic-qc.xhscdn.com/202512020930/7a8b9c/1040g2sg31aaaa02!nd_dft_wlteh_webp_3",
+    ]
+
+
+class _StateDriver:
+    """execute_script 返回页面 __INITIAL_STATE__ 信息流数据的替身"""
+
+    def __init__(self, feeds):
+        self.feeds = feeds
+
+    def execute_script(self, script, offset):
+        return json.dumps({"total": len(self.feeds), "items": self.feeds[offset:]})
+
+
+def test_feed_notes_without_desc_are_left_for_click_through(load_fixture):
+    records, offset = extract_xhs_feed_notes(_StateDriver(load_fixture("xhs_initial_state_feeds.json")))
+    assert [r["content_id"] for r in records] == ["6748b2c3000000000703d0f1"]
+    assert offset == 2
+
+
+class _Coordinator:
+    def __init__(self, claimed):
+        self.claimed = claimed
+        self.submitted = []
+
+    def claim(self, content_id):
+        return content_id not in self.claimed
+
+    def submit(self, content_id, content, text_data, image_urls, min_length=0):
+        self.submitted.append((content_id, content))
+
+    def save_checkpoint(self):
+        pass
+
+
+def test_consume_record_prepares_only_claimed_records(load_fixture):
+    records = parse_weibo_timeline(load_fixture("weibo_hottimeline.json"), CRAWL_TIME)
+    coordinator = _Coordinator(claimed={"5021473892811234"})
+    prepared = []
+
+    def prepare(record):
+        prepared.append(record["content_id"])
+        record["content"] = "全文"
+
+    for record in records[:2]:
+        consume_record(coordinator, record, min_length=10, prepare=prepare)
+
+    assert prepared == ["5021473892815678"]
+    assert coordinator.submitted == [("5021473892815678", "全文")]
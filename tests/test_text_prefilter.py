@@ -0,0 +1,61 @@
+"""本地预筛：默认配置下明确的中性文本不调用情绪引擎"""
+
+import pytest
+
+import emotion_filter
+from text_prefilter import TextPrefilter
+
+
+class _RemoteEngine:
+    """记录调用的远端引擎替身"""
+    remote = True
+    cache_version = "test"
+
+    def __init__(self):
+        self.calls = []
+
+    def score_batch(self, texts, batch_size=None):
+        self.calls.extend(texts)
+        return [{"emotions": {"喜": 0.9}, "dominant": "喜", "max_score": 0.9, "should_save": True}
+                for _ in texts]
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = _RemoteEngine()
+    monkeypatch.setattr(emotion_filter, "get_text_engine", lambda: engine)
+    monkeypatch.setattr(emotion_filter, "get_text_cache", lambda: None)
+    monkeypatch.setattr(emotion_filter, "get_prefilter", lambda: TextPrefilter(audit_rate=0.0))
+    return engine
+
+
+def test_default_lexicon_confidence_reaches_threshold():
+    prefilter = TextPrefilter(audit_rate=0.0)
+    assert prefilter.lexicon_confidence >= prefilter.threshold
+    skip, audit, confidence = prefilter.decide("地铁二号线明天起调整首班车时间")
+    assert skip and not audit
+    assert confidence >= prefilter.threshold
+
+
+def test_neutral_text_settled_without_engine(engine):
+    neutral = "地铁二号线明天起调整首班车时间"
+    results = emotion_filter.analyze_text_emotions_batch([neutral])
+    assert results[0]["source"] == "prefilter"
+    assert results[0]["should_save"] is False
+    assert engine.calls == []
+
+
+def test_emotional_text_still_sent_to_engine(engine):
+    neutral = "地铁二号线明天起调整首班车时间"
+    happy = "今天考完试了，太开心了哈哈"
+    results = emotion_filter.analyze_text_emotions_batch([neutral, happy])
+    assert engine.calls == [happy]
+    assert results[0]["source"] == "prefilter"
+    assert results[1]["should_save"] is True
+
+
+def test_exclamation_is_not_settled():
+    prefilter = TextPrefilter(audit_rate=0.0)
+    skip, _, confidence = prefilter.decide("明天起调整首班车时间！")
+    assert not skip
+    assert confidence == 0.0